@@ -0,0 +1,258 @@
+# Author- Carl Bass
+# Description- time the gouge geometry outside fusion on synthetic curves lying on analytic surfaces
+#
+# runs the same sampling, rail and section code the add-in uses against the adsk stand-in in ./stubs
+# and reports the time and number of api calls per curve
+#
+#   python benchmark.py                                    1, 100 and 5000 curves on a plane, sphere and cylinder
+#   python benchmark.py --curves 100 --json results.json   save the results
+#   python benchmark.py --baseline results.json            fail if any case got more than 50% slower per curve
+#   python benchmark.py --workers 8                        do the rail and section math in 8 processes
+#   python benchmark.py --mesh                             also gouge a tessellation of each surface with the mesh engine
+#   python benchmark.py --calibrate-pool --workers 4       measure where a 4 process pool starts beating one process
+#
+# the same cases run under pytest-benchmark in tests/test_benchmark.py for ci
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+python_file_folder = os.path.dirname (os.path.realpath (__file__))
+sys.path.insert (0, python_file_folder)
+sys.path.insert (0, os.path.join (python_file_folder, 'stubs'))
+
+import adsk, adsk.core
+import gouge_geometry
+import gouge_surface
+
+# unit normals of the analytic surfaces at (or nearest to) a point
+
+def plane_normal (p):
+    return (0.0, 0.0, 1.0)
+
+sphere_radius = 10.0
+
+def sphere_normal (p):
+    return gouge_geometry.normalize (p)
+
+cylinder_radius = 5.0
+
+def cylinder_normal (p):
+    return gouge_geometry.normalize ((p[0], p[1], 0.0))
+
+# points along curve k of count at fraction s, lying on each surface
+
+def plane_point (k, count, s):
+    return (s * 10.0, k * 0.1 + 0.5 * math.sin (4.0 * math.pi * s + k), 0.0)
+
+def sphere_point (k, count, s):
+    latitude = -0.6 + 1.2 * k / max (count, 1)
+    longitude = s * 1.5 + 0.2 * math.sin (2.0 * math.pi * s + k)
+    return (sphere_radius * math.cos (latitude) * math.cos (longitude),
+            sphere_radius * math.cos (latitude) * math.sin (longitude),
+            sphere_radius * math.sin (latitude))
+
+def cylinder_point (k, count, s):
+    angle = s * 2.0 + k * 0.01
+    return (cylinder_radius * math.cos (angle), cylinder_radius * math.sin (angle), k * 0.05 + s * 3.0)
+
+# points on a patch of each surface covering all count curves at u, v from 0 to 1, for the mesh engine
+
+def plane_patch (count, u, v):
+    return (-0.5 + 11.0 * u, -1.0 + (count * 0.1 + 2.0) * v, 0.0)
+
+def sphere_patch (count, u, v):
+    latitude = -0.7 + 1.4 * v
+    longitude = -0.3 + 2.1 * u
+    return (sphere_radius * math.cos (latitude) * math.cos (longitude),
+            sphere_radius * math.cos (latitude) * math.sin (longitude),
+            sphere_radius * math.sin (latitude))
+
+def cylinder_patch (count, u, v):
+    angle = -0.1 + (2.2 + count * 0.01) * u
+    return (cylinder_radius * math.cos (angle), cylinder_radius * math.sin (angle), -0.5 + (count * 0.05 + 4.0) * v)
+
+patches = {
+    'plane': plane_patch,
+    'sphere': sphere_patch,
+    'cylinder': cylinder_patch,
+}
+
+surfaces = {
+    'plane': (plane_point, plane_normal),
+    'sphere': (sphere_point, sphere_normal),
+    'cylinder': (cylinder_point, cylinder_normal),
+}
+
+# synthetic splines through a few points on the surface, like the fixed splines designers draw
+def synthetic_curves (surface_point, count, points_per_curve = 9):
+    curves = []
+    for k in range(count):
+        points = [surface_point (k, count, j / (points_per_curve - 1)) for j in range(points_per_curve)]
+        (control_points, knots, degree) = gouge_geometry.fit_nurbs (points)
+        control_points = [adsk.core.Point3D.create (*p) for p in control_points]
+        curves.append (adsk.core.NurbsCurve3D.createNonRational (control_points, degree, knots, False))
+    return curves
+
+# a coarse grid of triangles over the patch; the mesh engine refines it down to its edge length
+def patch_mesh (surface_name, count, size = 32):
+    (surface_point, surface_normal) = surfaces[surface_name]
+    points = [patches[surface_name] (count, i / size, j / size) for j in range(size + 1) for i in range(size + 1)]
+    normals = [surface_normal (p) for p in points]
+    triangles = []
+    for j in range(size):
+        for i in range(size):
+            a = j * (size + 1) + i
+            triangles += [(a, a + 1, a + size + 2), (a, a + size + 2, a + size + 1)]
+    return (points, normals, triangles)
+
+# the per curve work the add-in does before it creates anything in the design
+def run_case (surface_name, count, tool_diameter, sampling_tolerance, section_tolerance, workers, mesh):
+    (surface_point, surface_normal) = surfaces[surface_name]
+    curves = synthetic_curves (surface_point, count)
+    face_evaluator = adsk.core.SurfaceEvaluator (surface_normal)
+
+    profile = gouge_geometry.default_taper_profile
+    tool_radius = tool_diameter * 0.5
+
+    adsk.reset()
+    sampler = gouge_surface.curve_sampler (face_evaluator)
+    sample_count = 0
+    section_count = 0
+
+    start_time = time.perf_counter()
+    jobs = []
+    for curve in curves:
+        (points, normals) = sampler.sample_path ([(curve, False)], math.radians (sampling_tolerance))
+        jobs.append ((points, normals, tool_radius, tuple (profile), math.radians (section_tolerance), tool_radius))
+        sample_count += len(points)
+
+    rails = []
+    for (rail, circles) in gouge_surface.compute_gouges (jobs, workers):
+        gouge_surface.nurbs_curve (rail)
+        rails.append (rail)
+        section_count += len(circles)
+    clusters = gouge_geometry.rail_clusters (rails, tool_diameter)
+    seconds = time.perf_counter() - start_time
+
+    # the mesh engine works on the whole surface at once so it gets its own time
+    mesh_seconds = 0.0
+    mesh_vertices = 0
+    if mesh:
+        (points, normals, triangles) = patch_mesh (surface_name, count)
+        mesh_start_time = time.perf_counter()
+        (points, normals, triangles, moved, capped) = gouge_geometry.gouge_mesh (points, normals, triangles, rails, [tool_radius] * len(rails),
+                                                                                gouge_surface.mesh_edge_fraction * tool_diameter, gouge_surface.mesh_max_vertices)
+        mesh_seconds = time.perf_counter() - mesh_start_time
+        mesh_vertices = len(points)
+
+    return {
+        'surface': surface_name,
+        'curves': count,
+        'seconds': seconds,
+        'ms_per_curve': 1000.0 * seconds / count,
+        'sampler_calls_per_curve': sampler.api_calls / count,
+        'api_calls_per_curve': adsk.total_calls() / count,
+        'samples_per_curve': sample_count / count,
+        'sections_per_curve': section_count / count,
+        'clusters': len(clusters),
+        'mesh_seconds': mesh_seconds,
+        'mesh_vertices': mesh_vertices,
+    }
+
+# time the jobs in this process and in a pool at two sizes and fit time = startup + cost per sample to each
+# the pool wins past the sample count where the lines cross, which is what parallel_samples should be set to on this machine
+def calibrate_pool (surface_name, workers, counts = (50, 400)):
+    (surface_point, surface_normal) = surfaces[surface_name]
+    executable = gouge_surface.python_executable()
+    timings = []
+    for count in counts:
+        sampler = gouge_surface.curve_sampler (adsk.core.SurfaceEvaluator (surface_normal))
+        jobs = []
+        for curve in synthetic_curves (surface_point, count):
+            (points, normals) = sampler.sample_path ([(curve, False)], math.radians (gouge_surface.sampling_tolerance))
+            jobs.append ((points, normals, 0.5 * gouge_surface.tool_diameter, tuple (gouge_geometry.default_taper_profile),
+                          math.radians (gouge_surface.section_tolerance), 0.5 * gouge_surface.tool_diameter))
+        samples = sum (len(job[0]) for job in jobs)
+
+        start_time = time.perf_counter()
+        for job in jobs:
+            gouge_geometry.gouge_job (job)
+        serial = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        gouge_surface.pool_gouges (jobs, workers, executable)
+        pool = time.perf_counter() - start_time
+
+        timings.append ((samples, serial, pool))
+        print (f'{count:>7} curves {samples:>8} samples   serial {serial:>8.3f} sec   {workers} workers {pool:>8.3f} sec')
+
+    ((s0, serial0, pool0), (s1, serial1, pool1)) = timings
+    serial_cost = (serial1 - serial0) / (s1 - s0)
+    pool_cost = (pool1 - pool0) / (s1 - s0)
+    startup = pool0 - pool_cost * s0
+    print (f'serial {1.0e6 * serial_cost:.1f} us a sample, pool {1.0e6 * pool_cost:.1f} us a sample after {startup:.3f} sec to start')
+    if pool_cost < serial_cost:
+        print (f'the pool comes out ahead past {int (startup / (serial_cost - pool_cost))} samples')
+    else:
+        print (f'the pool never comes out ahead with {workers} workers on this machine')
+
+def main ():
+    parser = argparse.ArgumentParser (description = 'benchmark the gouge geometry outside fusion')
+    parser.add_argument ('--curves', type = int, nargs = '+', default = [1, 100, 5000])
+    parser.add_argument ('--surfaces', nargs = '+', choices = sorted (surfaces), default = ['plane', 'sphere', 'cylinder'])
+    parser.add_argument ('--tool-diameter', type = float, default = gouge_surface.tool_diameter)
+    parser.add_argument ('--sampling-tolerance', type = float, default = gouge_surface.sampling_tolerance)
+    parser.add_argument ('--section-tolerance', type = float, default = gouge_surface.section_tolerance)
+    parser.add_argument ('--workers', type = int, default = 1, help = 'worker processes for the rail and section math')
+    parser.add_argument ('--mesh', action = 'store_true', help = 'also time the mesh engine on a tessellation of each surface')
+    parser.add_argument ('--calibrate-pool', action = 'store_true', help = 'measure how many samples it takes for the process pool to pay off')
+    parser.add_argument ('--json', help = 'write the results to this file')
+    parser.add_argument ('--baseline', help = 'compare against results saved with --json')
+    parser.add_argument ('--max-slowdown', type = float, default = 1.5, help = 'allowed ratio of ms per curve against the baseline')
+    args = parser.parse_args()
+
+    if args.calibrate_pool:
+        calibrate_pool (args.surfaces[0], max (args.workers, 2))
+        return
+
+    results = []
+    print (f'{"surface":>10} {"curves":>7} {"sec":>8} {"ms/curve":>9} {"api/curve":>10} {"samples":>8} {"sections":>9} {"clusters":>9}'
+           + (f' {"mesh sec":>9} {"vertices":>9}' if args.mesh else ''))
+    for surface_name in args.surfaces:
+        for count in args.curves:
+            result = run_case (surface_name, count, args.tool_diameter, args.sampling_tolerance, args.section_tolerance, args.workers, args.mesh)
+            results.append (result)
+            print (f'{surface_name:>10} {count:>7} {result["seconds"]:>8.3f} {result["ms_per_curve"]:>9.3f} '
+                   f'{result["api_calls_per_curve"]:>10.1f} {result["samples_per_curve"]:>8.1f} {result["sections_per_curve"]:>9.1f} {result["clusters"]:>9}'
+                   + (f' {result["mesh_seconds"]:>9.3f} {result["mesh_vertices"]:>9}' if args.mesh else ''))
+
+    if args.json:
+        with open (args.json, 'w') as f:
+            json.dump (results, f, indent = 2)
+
+    # a regression is any case that's now slower per curve than the baseline allows or makes more api calls
+    if args.baseline:
+        with open (args.baseline) as f:
+            baseline = {(r['surface'], r['curves']): r for r in json.load (f)}
+
+        regressions = []
+        for result in results:
+            previous = baseline.get ((result['surface'], result['curves']))
+            if previous is None:
+                continue
+            if result['ms_per_curve'] > previous['ms_per_curve'] * args.max_slowdown:
+                regressions.append (f'{result["surface"]} x {result["curves"]}: {previous["ms_per_curve"]:.3f} -> {result["ms_per_curve"]:.3f} ms per curve')
+            if result['api_calls_per_curve'] > previous['api_calls_per_curve']:
+                regressions.append (f'{result["surface"]} x {result["curves"]}: {previous["api_calls_per_curve"]:.1f} -> {result["api_calls_per_curve"]:.1f} api calls per curve')
+
+        for regression in regressions:
+            print (f'regression: {regression}')
+        if regressions:
+            sys.exit (1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# Author- Carl Bass
+# Description- writes gouge toolpaths as csv or json point lists or as simple g-code; plain python
+#
+# a toolpath is a list of (point, axis) in fusion's internal centimeters where the point is the bottom of the gouge
+# and the axis is the surface normal there, so the point is the tip of a ball nose tool tilted to the axis
+
+import csv
+import json
+
+try:
+    from . import gouge_geometry
+except ImportError:
+    import gouge_geometry
+
+# one row per point
+def write_csv (path, toolpaths):
+    with open (path, 'w', newline = '') as f:
+        writer = csv.writer (f)
+        writer.writerow (['toolpath', 'x', 'y', 'z', 'i', 'j', 'k'])
+        for (n, toolpath) in enumerate (toolpaths):
+            for (point, axis) in toolpath:
+                writer.writerow ([n] + [f'{x:.6f}' for x in point] + [f'{x:.6f}' for x in axis])
+
+def write_json (path, toolpaths):
+    report = {
+        'units': 'cm',
+        'toolpaths': [{'points': [point for (point, axis) in toolpath], 'axes': [axis for (point, axis) in toolpath]} for toolpath in toolpaths],
+    }
+    with open (path, 'w') as f:
+        json.dump (report, f)
+
+# 3 axis g-code in millimeters: rapid to clearance over the start of each toolpath, plunge, feed along it and retract
+# the tool stays vertical so each point is moved to where the tip of a ball end mill of that toolpath's radius has to be
+# for the ball to touch the bottom of the gouge, which is only the point itself where the surface is flat
+# straight runs are merged into single moves as long as every dropped point stays within merge_tolerance
+# returns the number of moves written and the number of points they came from
+def write_gcode (path, toolpaths, radii, feed_rate, plunge_rate, clearance, merge_tolerance, program = 'gouges'):
+    tip_paths = [[point for (point, axis) in gouge_geometry.tool_tip_points (toolpath, radius)] for (toolpath, radius) in zip (toolpaths, radii)]
+    top = max ((point[2] for tip_path in tip_paths for point in tip_path), default = 0.0)
+    safe_z = 10.0 * (top + clearance)
+
+    moves = 0
+    points = 0
+    with open (path, 'w') as f:
+        # parentheses would end the comment early
+        program = program.replace ('(', '[').replace (')', ']')
+        f.write (f'%\n({program})\n(ball end mill tip positions)\nG21 G90 G17\nG0 Z{safe_z:.4f}\n')
+        for (n, (tip_path, radius)) in enumerate (zip (tip_paths, radii)):
+            kept = [tip_path[k] for k in gouge_geometry.merge_collinear (tip_path, merge_tolerance)]
+            points += len(tip_path)
+            moves += len(kept)
+
+            (x, y, z) = [10.0 * c for c in kept[0]]
+            f.write (f'(toolpath {n} {20.0 * radius:.3f} mm ball end mill)\nG0 X{x:.4f} Y{y:.4f}\nG1 Z{z:.4f} F{plunge_rate:.0f}\n')
+            f.write (f'F{feed_rate:.0f}\n')
+            for point in kept[1:]:
+                (x, y, z) = [10.0 * c for c in point]
+                f.write (f'G1 X{x:.4f} Y{y:.4f} Z{z:.4f}\n')
+            f.write (f'G0 Z{safe_z:.4f}\n')
+        f.write ('M30\n%\n')
+
+    return (moves, points)
@@ -0,0 +1,848 @@
+# Author- Carl Bass
+# Description- geometry for surface gouges that doesn't need fusion; plain python so it can run anywhere
+
+import math
+import functools
+from collections import namedtuple
+
+# everything about a toolpath that's needed to build the gouge: the fitted nurbs plus the surface normals along it
+rail_curve = namedtuple ('rail_curve', ['control_points', 'knots', 'degree', 'fractions', 'normals'])
+
+# how the depth of a gouge varies along its length and how many loft sections it gets
+# samples are only used by the 'samples' profile: depth fractions evenly spaced from start to end
+taper_profile = namedtuple ('taper_profile', ['name', 'station_count', 'samples'])
+
+taper_profile_names = ('sine', 'linear', 'cosine', 'elliptic', 'samples')
+default_taper_profile = taper_profile ('sine', 3, ())
+
+# simple vector math on (x, y, z) tuples
+
+def add (a, b):
+    return (a[0] + b[0], a[1] + b[1], a[2] + b[2])
+
+def sub (a, b):
+    return (a[0] - b[0], a[1] - b[1], a[2] - b[2])
+
+def scale (a, s):
+    return (a[0] * s, a[1] * s, a[2] * s)
+
+def dot (a, b):
+    return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+
+def cross (a, b):
+    return (a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0])
+
+def length (a):
+    return math.sqrt (dot (a, a))
+
+def distance (a, b):
+    return length (sub (a, b))
+
+def normalize (a):
+    l = length (a)
+    if l == 0.0:
+        return a
+    return scale (a, 1.0 / l)
+
+def angle_between (a, b):
+    la = length (a)
+    lb = length (b)
+    if la == 0.0 or lb == 0.0:
+        return 0.0
+    return math.acos (min (max (dot (a, b) / (la * lb), -1.0), 1.0))
+
+# fraction of the total length at each point of a polyline, 0.0 at the start and 1.0 at the end
+def length_fractions (points):
+    lengths = [0.0]
+    for k in range(1, len(points)):
+        lengths.append (lengths[-1] + distance (points[k - 1], points[k]))
+
+    total = lengths[-1]
+    if total == 0.0:
+        return [0.0 for l in lengths]
+
+    return [l / total for l in lengths]
+
+# fraction of the full depth at fraction t along the curve; the named profiles are zero at both ends and one in the middle
+def taper_fraction (profile, t):
+    name = profile.name
+    if name == 'sine':
+        return math.sin (math.pi * t)
+    elif name == 'linear':
+        return 1.0 - abs (2.0 * t - 1.0)
+    elif name == 'cosine':
+        return 0.5 - 0.5 * math.cos (2.0 * math.pi * t)
+    elif name == 'elliptic':
+        return math.sqrt (max (0.0, 1.0 - (2.0 * t - 1.0) ** 2))
+    elif name == 'samples':
+        samples = profile.samples
+        if len(samples) < 2:
+            return samples[0] if samples else 0.0
+        x = min (max (t, 0.0), 1.0) * (len(samples) - 1)
+        k = min (int (x), len(samples) - 2)
+        return samples[k] + (samples[k + 1] - samples[k]) * (x - k)
+    else:
+        raise ValueError (f'unknown taper profile {name}')
+
+# depth of the gouge at fraction t along the curve
+def taper_depth (t, depth, profile = default_taper_profile):
+    return depth * taper_fraction (profile, t)
+
+# stations along the rail that get a loft section; they only depend on the profile so every curve sharing it reuses them
+@functools.lru_cache (maxsize = None)
+def profile_stations (profile):
+    count = max (profile.station_count, 2)
+    return tuple (k / (count - 1) for k in range(count))
+
+# sample a curve between two parameters, splitting intervals where the tangent or surface normal turns more than tolerance radians
+# evaluate takes a list of parameters and returns the (points, tangents, normals) for all of them so each pass is one batch
+def adaptive_samples (evaluate, start, end, tolerance, initial_count = 9, max_passes = 6, max_samples = 513):
+    parameters = [start + (end - start) * k / (initial_count - 1) for k in range(initial_count)]
+    samples = list (zip (parameters, *evaluate (parameters)))
+
+    for p in range(max_passes):
+        new_parameters = []
+        for k in range(len(samples) - 1):
+            (u0, p0, t0, n0) = samples[k]
+            (u1, p1, t1, n1) = samples[k + 1]
+            if angle_between (t0, t1) > tolerance or angle_between (n0, n1) > tolerance:
+                new_parameters.append ((u0 + u1) * 0.5)
+
+        if not new_parameters or len(samples) + len(new_parameters) > max_samples:
+            break
+
+        samples = sorted (samples + list (zip (new_parameters, *evaluate (new_parameters))), key = lambda sample: sample[0])
+
+    (parameters, points, tangents, normals) = zip (*samples)
+    return (list(parameters), list(points), list(tangents), list(normals))
+
+# push each sample down along the surface normal by the tapering depth to get the path the bottom of the tool follows
+def offset_points (points, normals, depth, profile = default_taper_profile):
+    fractions = length_fractions (points)
+    return [sub (p, scale (normalize (n), taper_depth (t, depth, profile))) for (p, n, t) in zip (points, normals, fractions)]
+
+# drop points that sit on top of the previous one; they make the interpolation singular
+def remove_duplicates (points, tolerance = 1.0e-9):
+    unique = [points[0]]
+    for p in points[1:]:
+        if distance (p, unique[-1]) > tolerance:
+            unique.append (p)
+    return unique
+
+# a curve needs at least two distinct samples to have any length to fit a rail along
+def has_length (points, tolerance = 1.0e-9):
+    return len(points) > 0 and len(remove_duplicates (points, tolerance)) > 1
+
+# join curves whose ends meet into chains so connected curves make a single gouge
+# endpoints is a (start, end) pair for each curve; chains only pass through points where exactly two curve ends meet
+# returns a list of chains, each an ordered list of (curve index, flipped)
+def chain_curves (endpoints, tolerance):
+    node_points = []
+    grid = {}
+
+    def node_at (p):
+        key = tuple (int (math.floor (c / tolerance)) for c in p)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for dz in (-1, 0, 1):
+                    for node in grid.get ((key[0] + dx, key[1] + dy, key[2] + dz), []):
+                        if distance (node_points[node], p) <= tolerance:
+                            return node
+        node_points.append (p)
+        grid.setdefault (key, []).append (len(node_points) - 1)
+        return len(node_points) - 1
+
+    ends = [(node_at (start), node_at (end)) for (start, end) in endpoints]
+
+    node_curves = {}
+    for (i, (a, b)) in enumerate (ends):
+        node_curves.setdefault (a, []).append (i)
+        node_curves.setdefault (b, []).append (i)
+
+    used = [False] * len(ends)
+
+    # the unused curve that continues through a node, if there's exactly one way to go
+    def next_curve (node):
+        attached = node_curves[node]
+        if len(attached) != 2:
+            return None
+        for i in attached:
+            if not used[i]:
+                return i
+        return None
+
+    chains = []
+    for first in range(len(ends)):
+        if used[first]:
+            continue
+        used[first] = True
+        chain = [(first, False)]
+
+        # walk forward from the end of the chain
+        node = ends[first][1]
+        i = next_curve (node)
+        while i is not None:
+            used[i] = True
+            flipped = ends[i][0] != node
+            chain.append ((i, flipped))
+            node = ends[i][0] if flipped else ends[i][1]
+            i = next_curve (node)
+
+        # and backward from the start
+        node = ends[first][0]
+        i = next_curve (node)
+        while i is not None:
+            used[i] = True
+            flipped = ends[i][1] != node
+            chain.insert (0, (i, flipped))
+            node = ends[i][1] if flipped else ends[i][0]
+            i = next_curve (node)
+
+        chains.append (chain)
+
+    return chains
+
+# bounding volume hierarchy over axis aligned (min, max) boxes for finding the boxes a point is in
+class box_tree:
+    def __init__(self, boxes, leaf_size = 4):
+        self.boxes = boxes
+        self.leaf_size = leaf_size
+        self.root = self.build (list (range (len(boxes)))) if boxes else None
+
+    # each node is (min, max, box indices for a leaf, children for a branch)
+    def build (self, indices):
+        low = tuple (min (self.boxes[i][0][a] for i in indices) for a in range(3))
+        high = tuple (max (self.boxes[i][1][a] for i in indices) for a in range(3))
+
+        if len(indices) <= self.leaf_size:
+            return (low, high, indices, None)
+
+        # split at the median box center along the longest axis
+        axis = max (range(3), key = lambda a: high[a] - low[a])
+        indices = sorted (indices, key = lambda i: self.boxes[i][0][axis] + self.boxes[i][1][axis])
+        middle = len(indices) // 2
+        return (low, high, None, (self.build (indices[:middle]), self.build (indices[middle:])))
+
+    # indices of the boxes that contain the point, growing every box by tolerance
+    def query (self, point, tolerance = 0.0):
+        found = []
+        stack = [self.root] if self.root else []
+        while stack:
+            (low, high, indices, children) = stack.pop()
+            if not box_contains (low, high, point, tolerance):
+                continue
+            if indices is None:
+                stack += children
+            else:
+                found += [i for i in indices if box_contains (self.boxes[i][0], self.boxes[i][1], point, tolerance)]
+        return found
+
+    # index of the box closest to the point
+    def nearest (self, point):
+        return min (range (len(self.boxes)), key = lambda i: box_distance (self.boxes[i][0], self.boxes[i][1], point))
+
+def box_contains (low, high, point, tolerance):
+    return all (low[a] - tolerance <= point[a] <= high[a] + tolerance for a in range(3))
+
+def box_distance (low, high, point):
+    return length (tuple (max (low[a] - point[a], 0.0, point[a] - high[a]) for a in range(3)))
+
+# uniform grid of cells for finding things near a point without checking everything
+# items are added with a bounding box and land in every cell the box touches
+class spatial_grid:
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def cell (self, point):
+        return tuple (int (math.floor (point[a] / self.cell_size)) for a in range(3))
+
+    def add (self, low, high, item):
+        (i0, j0, k0) = self.cell (low)
+        (i1, j1, k1) = self.cell (high)
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                for k in range(k0, k1 + 1):
+                    self.cells.setdefault ((i, j, k), []).append (item)
+
+    # items whose boxes touch the cell the point is in
+    def items_at (self, point):
+        return self.cells.get (self.cell (point), ())
+
+    # items in the cell the point is in and the 26 around it
+    def items_near (self, point):
+        (i, j, k) = self.cell (point)
+        found = []
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                for dk in (-1, 0, 1):
+                    found += self.cells.get ((i + di, j + dj, k + dk), ())
+        return found
+
+# find the knot span containing u (the nurbs book, A2.1)
+def find_span (n, degree, u, knots):
+    if u >= knots[n + 1]:
+        return n
+    if u <= knots[degree]:
+        return degree
+
+    low = degree
+    high = n + 1
+    mid = (low + high) // 2
+    while u < knots[mid] or u >= knots[mid + 1]:
+        if u < knots[mid]:
+            high = mid
+        else:
+            low = mid
+        mid = (low + high) // 2
+    return mid
+
+# the degree + 1 non-zero basis functions at u (the nurbs book, A2.2)
+def basis_functions (span, u, degree, knots):
+    basis = [1.0] + [0.0] * degree
+    left = [0.0] * (degree + 1)
+    right = [0.0] * (degree + 1)
+
+    for j in range(1, degree + 1):
+        left[j] = u - knots[span + 1 - j]
+        right[j] = knots[span + j] - u
+        saved = 0.0
+        for r in range(j):
+            temp = basis[r] / (right[r + 1] + left[j - r])
+            basis[r] = saved + right[r + 1] * temp
+            saved = left[j - r] * temp
+        basis[j] = saved
+
+    return basis
+
+# point on a non-rational nurbs curve at parameter u
+def curve_point (control_points, knots, degree, u):
+    n = len(control_points) - 1
+    span = find_span (n, degree, u, knots)
+    basis = basis_functions (span, u, degree, knots)
+
+    point = (0.0, 0.0, 0.0)
+    for j in range(degree + 1):
+        point = add (point, scale (control_points[span - degree + j], basis[j]))
+    return point
+
+# control points, knots and degree of the first derivative of a non-rational nurbs curve
+# worth keeping when the derivative is evaluated many times along the same curve
+def derivative_curve (control_points, knots, degree):
+    derivative_points = []
+    for i in range(len(control_points) - 1):
+        span = knots[i + degree + 1] - knots[i + 1]
+        if span > 0.0:
+            derivative_points.append (scale (sub (control_points[i + 1], control_points[i]), degree / span))
+        else:
+            derivative_points.append ((0.0, 0.0, 0.0))
+    return (derivative_points, knots[1:-1], degree - 1)
+
+# first derivative of a non-rational nurbs curve at parameter u using the derivative curve's control points
+def curve_derivative (control_points, knots, degree, u):
+    if degree == 0:
+        return (0.0, 0.0, 0.0)
+    (derivative_points, derivative_knots, derivative_degree) = derivative_curve (control_points, knots, degree)
+    return curve_point (derivative_points, derivative_knots, derivative_degree, u)
+
+# gaussian elimination for a banded system; the collocation matrix is totally positive so no pivoting is needed
+def solve_banded (matrix, rhs, bandwidth):
+    size = len(matrix)
+
+    for col in range(size):
+        pivot = matrix[col][col]
+        last = min (size, col + bandwidth + 1)
+        for row in range(col + 1, last):
+            factor = matrix[row][col] / pivot
+            if factor != 0.0:
+                for k in range(col, last):
+                    matrix[row][k] -= factor * matrix[col][k]
+                rhs[row] = sub (rhs[row], scale (rhs[col], factor))
+
+    solution = [None] * size
+    for row in range(size - 1, -1, -1):
+        value = rhs[row]
+        for k in range(row + 1, min (size, row + bandwidth + 1)):
+            value = sub (value, scale (solution[k], matrix[row][k]))
+        solution[row] = scale (value, 1.0 / matrix[row][row])
+
+    return solution
+
+# interpolate the points with a cubic nurbs using chord length parameters and averaged knots (the nurbs book, A9.1)
+# returns the control points, knot vector and degree
+def fit_nurbs (points, degree = 3):
+    points = remove_duplicates (points)
+    n = len(points) - 1
+    if n < 1:
+        raise ValueError ('a curve needs at least two distinct points')
+    degree = min (degree, n)
+
+    parameters = length_fractions (points)
+
+    knots = [0.0] * (degree + 1)
+    for j in range(1, n - degree + 1):
+        knots.append (sum (parameters[j:j + degree]) / degree)
+    knots += [1.0] * (degree + 1)
+
+    matrix = [[0.0] * (n + 1) for k in range(n + 1)]
+    for k in range(n + 1):
+        span = find_span (n, degree, parameters[k], knots)
+        basis = basis_functions (span, parameters[k], degree, knots)
+        for j in range(degree + 1):
+            matrix[k][span - degree + j] = basis[j]
+
+    control_points = solve_banded (matrix, list(points), degree)
+
+    return (control_points, knots, degree)
+
+# sample the curve, push the samples down along the surface normals and fit a nurbs through them
+def compute_rail (points, normals, depth, profile = default_taper_profile):
+    rail_points = offset_points (points, normals, depth, profile)
+    (control_points, knots, degree) = fit_nurbs (rail_points)
+    return rail_curve (control_points, knots, degree, length_fractions (rail_points), [normalize (n) for n in normals])
+
+# linearly interpolate the sampled normals at fraction t along the rail
+def interpolate_normal (fractions, normals, t):
+    for k in range(1, len(fractions)):
+        if t <= fractions[k] or k == len(fractions) - 1:
+            width = fractions[k] - fractions[k - 1]
+            if width <= 0.0:
+                return normals[k]
+            s = min (max ((t - fractions[k - 1]) / width, 0.0), 1.0)
+            return normalize (add (scale (normals[k - 1], 1.0 - s), scale (normals[k], s)))
+    return normals[0]
+
+# frame at a station: the rail tangent, the surface normal projected into the plane across the rail and the side direction
+def station_frame (tangent, normal):
+    tangent = normalize (tangent)
+    up = sub (normal, scale (tangent, dot (normal, tangent)))
+
+    # surface normal runs along the rail; pick any direction across it
+    if length (up) < 1.0e-9:
+        axis = (1.0, 0.0, 0.0) if abs (tangent[0]) < 0.9 else (0.0, 1.0, 0.0)
+        up = cross (tangent, axis)
+
+    up = normalize (up)
+    return (tangent, up, cross (tangent, up))
+
+# add stations between the profile's stations wherever the rail tangent or surface normal turns more than tolerance radians
+# straight gouges keep just the profile stations and curvy ones get more; no api calls are needed since it works on the fitted rail
+def adaptive_stations (rail, stations, tolerance, max_passes = 4):
+    def direction (t):
+        return (curve_derivative (rail.control_points, rail.knots, rail.degree, t), interpolate_normal (rail.fractions, rail.normals, t))
+
+    stations = [(t, direction (t)) for t in stations]
+    for p in range(max_passes):
+        refined = [stations[0]]
+        for ((t0, (tangent0, normal0)), (t1, (tangent1, normal1))) in zip (stations, stations[1:]):
+            if angle_between (tangent0, tangent1) > tolerance or angle_between (normal0, normal1) > tolerance:
+                t = (t0 + t1) * 0.5
+                refined.append ((t, direction (t)))
+            refined.append ((t1, (tangent1, normal1)))
+
+        if len(refined) == len(stations):
+            break
+        stations = refined
+
+    return [t for (t, d) in stations]
+
+# circle sections of the tool at each station along the rail as (center, axis, radius)
+# the bottom of each circle touches the rail and the circle sits up along the projected surface normal
+def section_circles (rail, stations, radius):
+    circles = []
+    for t in stations:
+        point = curve_point (rail.control_points, rail.knots, rail.degree, t)
+        tangent = curve_derivative (rail.control_points, rail.knots, rail.degree, t)
+        normal = interpolate_normal (rail.fractions, rail.normals, t)
+
+        (tangent, up, side) = station_frame (tangent, normal)
+        circles.append ((add (point, scale (up, radius)), tangent, radius))
+
+    return circles
+
+# fractions along the rail where the polyline through the rail points stays within tolerance of the rail
+# every span is split in half until the middle of the rail is within tolerance of the chord
+def chordal_fractions (rail, tolerance, initial_count = 9, max_depth = 12):
+    def point (t):
+        return curve_point (rail.control_points, rail.knots, rail.degree, t)
+
+    fractions = [0.0]
+    spans = [(j / (initial_count - 1), (j + 1) / (initial_count - 1), 0) for j in range(initial_count - 1)]
+    spans.reverse()
+    while spans:
+        (t0, t1, depth) = spans.pop()
+        t = (t0 + t1) * 0.5
+        if depth < max_depth and point_segment_distance (point (t), point (t0), point (t1)) > tolerance:
+            spans += [(t, t1, depth + 1), (t0, t, depth + 1)]
+        else:
+            fractions.append (t1)
+    return fractions
+
+# points along the rail within tolerance of it, each with the tool axis, which is the surface normal there
+def toolpath_points (rail, tolerance):
+    return [(curve_point (rail.control_points, rail.knots, rail.degree, t), interpolate_normal (rail.fractions, rail.normals, t))
+            for t in chordal_fractions (rail, tolerance)]
+
+# where the tip of a 3 axis ball end tool goes for the ball to touch the rail at the point: the ball center is a radius out along
+# the surface normal and the tip is a radius straight down from the center, so only where the normal points up is it the point itself
+def tool_tip (point, normal, radius):
+    return (point[0] + radius * normal[0], point[1] + radius * normal[1], point[2] + radius * (normal[2] - 1.0))
+
+# toolpath points moved to the 3 axis tool tip, with the axis straight up
+def tool_tip_points (toolpath, radius):
+    return [(tool_tip (point, axis, radius), (0.0, 0.0, 1.0)) for (point, axis) in toolpath]
+
+# the rail refitted through the 3 axis tool tip at each of its samples, for cam operations that drive the tool tip along a curve
+def tool_tip_rail (rail, radius):
+    tips = [tool_tip (curve_point (rail.control_points, rail.knots, rail.degree, t), normal, radius) for (t, normal) in zip (rail.fractions, rail.normals)]
+    (control_points, knots, degree) = fit_nurbs (tips)
+    return rail_curve (control_points, knots, degree, length_fractions (tips), rail.normals)
+
+def point_segment_distance (p, a, b):
+    d = sub (b, a)
+    length_squared = dot (d, d)
+    t = min (max (dot (sub (p, a), d) / length_squared, 0.0), 1.0) if length_squared > 0.0 else 0.0
+    return distance (p, add (a, scale (d, t)))
+
+# indices of the points to keep so that straight moves between them stay within tolerance of every point that's dropped
+def merge_collinear (points, tolerance):
+    if len(points) < 3:
+        return list (range (len(points)))
+
+    kept = [0]
+    for j in range(2, len(points)):
+        anchor = kept[-1]
+        if any (point_segment_distance (points[k], points[anchor], points[j]) > tolerance for k in range(anchor + 1, j)):
+            kept.append (j - 1)
+    kept.append (len(points) - 1)
+    return kept
+
+# the rail with a fraction trim cut off each end, refitted through points sampled along what's left
+# used when a loft fails on the ends of a rail where the tangent runs into the surface
+def trim_rail (rail, trim, count = 33):
+    fractions = [trim + (1.0 - 2.0 * trim) * j / (count - 1) for j in range(count)]
+    points = [curve_point (rail.control_points, rail.knots, rail.degree, t) for t in fractions]
+    normals = [interpolate_normal (rail.fractions, rail.normals, t) for t in fractions]
+    (control_points, knots, degree) = fit_nurbs (points)
+    return rail_curve (control_points, knots, degree, length_fractions (points), normals)
+
+# triangle mesh of the tool swept along the rail: rings of the tool circle at evenly spaced stations joined by triangles
+# returns flat lists of vertex coordinates and normals and the vertex indices of the triangles, starting at first_index
+def tube_mesh (rail, radius, rings, segments, first_index = 0):
+    coordinates = []
+    normals = []
+    indices = []
+
+    for j in range(rings):
+        t = j / (rings - 1)
+        point = curve_point (rail.control_points, rail.knots, rail.degree, t)
+        tangent = curve_derivative (rail.control_points, rail.knots, rail.degree, t)
+        (tangent, up, side) = station_frame (tangent, interpolate_normal (rail.fractions, rail.normals, t))
+        center = add (point, scale (up, radius))
+
+        # start at the bottom of the circle, which is on the rail
+        for k in range(segments):
+            angle = 2.0 * math.pi * k / segments
+            direction = add (scale (up, -math.cos (angle)), scale (side, math.sin (angle)))
+            coordinates += add (center, scale (direction, radius))
+            normals += direction
+
+    for j in range(rings - 1):
+        for k in range(segments):
+            a = first_index + j * segments + k
+            b = first_index + j * segments + (k + 1) % segments
+            c = a + segments
+            d = b + segments
+            indices += [a, b, d, a, d, c]
+
+    return (coordinates, normals, indices)
+
+# points along the rail at evenly spaced fractions, as a flat list of coordinates
+def rail_polyline (rail, count):
+    coordinates = []
+    for j in range(count):
+        coordinates += curve_point (rail.control_points, rail.knots, rail.degree, j / (count - 1))
+    return coordinates
+
+# ball centers of the tool at evenly spaced fractions along the rail, no further apart than spacing
+def rail_centers (rail, radius, spacing, max_count = 2000):
+    polygon = sum (distance (a, b) for (a, b) in zip (rail.control_points, rail.control_points[1:]))
+    count = min (max (2, int (math.ceil (polygon / spacing)) + 1), max_count)
+
+    derivative = derivative_curve (rail.control_points, rail.knots, rail.degree)
+    centers = []
+    for j in range(count):
+        t = j / (count - 1)
+        point = curve_point (rail.control_points, rail.knots, rail.degree, t)
+        tangent = curve_point (*derivative, t)
+        (tangent, up, side) = station_frame (tangent, interpolate_normal (rail.fractions, rail.normals, t))
+        centers.append (add (point, scale (up, radius)))
+    return centers
+
+# groups of rails that come within reach of each other, as lists of rail indices in order
+# rails are sampled no further apart than half of reach and any two samples on different rails closer than reach join their rails
+def rail_clusters (rails, reach, max_count = 2000):
+    # each cell keeps its samples by rail so rails that are already joined can be skipped all at once
+    grid = spatial_grid (reach)
+    for (k, rail) in enumerate (rails):
+        polygon = sum (distance (a, b) for (a, b) in zip (rail.control_points, rail.control_points[1:]))
+        count = min (max (2, int (math.ceil (2.0 * polygon / reach)) + 1), max_count)
+        for j in range(count):
+            p = curve_point (rail.control_points, rail.knots, rail.degree, j / (count - 1))
+            grid.cells.setdefault (grid.cell (p), {}).setdefault (k, []).append (p)
+
+    # union find over the rails with the roots kept as the lowest index
+    parents = list (range (len(rails)))
+    def root (k):
+        while parents[k] != k:
+            parents[k] = parents[parents[k]]
+            k = parents[k]
+        return k
+
+    # the samples in a cell gathered by the cluster their rail is in so far
+    def by_root (cell):
+        groups = {}
+        for (k, points) in cell.items():
+            groups.setdefault (root (k), []).extend (points)
+        return groups
+
+    # compare every cell with itself and its neighbors; once a region has merged there's one group per cell and nothing to check
+    reach_squared = reach * reach
+    for ((i, j, l), cell) in grid.cells.items():
+        groups = by_root (cell)
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                for dl in (-1, 0, 1):
+                    neighbor = grid.cells.get ((i + di, j + dj, l + dl))
+                    if neighbor is None:
+                        continue
+                    neighbor_groups = by_root (neighbor)
+                    for (a, points) in groups.items():
+                        for (b, neighbor_points) in neighbor_groups.items():
+                            (a, b) = (root (a), root (b))
+                            if a != b and any (dot (sub (p, q), sub (p, q)) < reach_squared for p in points for q in neighbor_points):
+                                parents[max (a, b)] = min (a, b)
+
+    clusters = {}
+    for k in range(len(rails)):
+        clusters.setdefault (root (k), []).append (k)
+    return list (clusters.values())
+
+# triangle meshes are kept as a list of point tuples, a list of normal tuples and a list of (a, b, c) vertex index triangles
+# fusion hands them over as flat lists of doubles and ints so these convert back and forth
+def unflatten_mesh (coordinates, normals, indices):
+    points = [tuple (coordinates[k:k + 3]) for k in range(0, len(coordinates), 3)]
+    vertex_normals = [normalize (tuple (normals[k:k + 3])) for k in range(0, len(normals), 3)]
+    triangles = [tuple (indices[k:k + 3]) for k in range(0, len(indices), 3)]
+    return (points, vertex_normals, triangles)
+
+def flatten_mesh (points, normals, triangles):
+    return ([x for p in points for x in p], [x for n in normals for x in n], [k for t in triangles for k in t])
+
+# mesh bodies can also have quads and polygons, given as flat index lists with the node count of each polygon
+# they are split into fans of triangles from their first vertex so nothing is left out of the mesh
+def polygon_triangles (quad_indices, polygon_indices = (), polygon_sizes = ()):
+    triangles = []
+    polygons = [quad_indices[k:k + 4] for k in range(0, len(quad_indices), 4)]
+    start = 0
+    for size in polygon_sizes:
+        polygons.append (polygon_indices[start:start + size])
+        start += size
+    for polygon in polygons:
+        for k in range(1, len(polygon) - 1):
+            triangles.append ((polygon[0], polygon[k], polygon[k + 1]))
+    return triangles
+
+# merge vertices closer than the tolerance, like the ones along the edges between separately tessellated faces,
+# so the mesh is connected and vertices on both sides of an edge move together; normals are averaged
+def weld_mesh (points, normals, triangles, tolerance = 1.0e-6):
+    merged = {}
+    remap = []
+    welded_points = []
+    normal_sums = []
+    for (p, n) in zip (points, normals):
+        key = tuple (int (round (x / tolerance)) for x in p)
+        if key not in merged:
+            merged[key] = len(welded_points)
+            welded_points.append (p)
+            normal_sums.append (n)
+        else:
+            k = merged[key]
+            normal_sums[k] = add (normal_sums[k], n)
+        remap.append (merged[key])
+
+    welded_triangles = []
+    for (a, b, c) in triangles:
+        (a, b, c) = (remap[a], remap[b], remap[c])
+        if a != b and b != c and c != a:
+            welded_triangles.append ((a, b, c))
+
+    return (welded_points, [normalize (n) for n in normal_sums], welded_triangles)
+
+# split every edge longer than max_edge at its middle until none are left, the pass limit is hit or the mesh has max_vertices
+# only edges wanted says yes to are split, so the mesh can be refined just where something will happen to it
+# triangles are split by how many of their edges were split so neighbors always agree and there are no cracks
+# new vertices are on the flat triangles, so the tessellation should already follow curved faces closely
+# an edge that isn't split never will be, so triangles with none split are set aside and only new triangles get another pass
+# when a pass wants more vertices than are left only the longest edges are split, so the budget is spread over the whole surface
+# and capped says refinement stopped early
+def refine_mesh (points, normals, triangles, max_edge, max_vertices, wanted = None, max_passes = 8):
+    points = list (points)
+    normals = list (normals)
+    max_edge_squared = max_edge * max_edge
+    settled = set()
+    done = []
+    capped = False
+
+    for p in range(max_passes):
+        # find the edges to split this pass
+        lengths = {}
+        for (a, b, c) in triangles:
+            for (i, j) in ((a, b), (b, c), (c, a)):
+                key = (i, j) if i < j else (j, i)
+                if key in lengths or key in settled:
+                    continue
+                (pa, pb) = (points[i], points[j])
+                (dx, dy, dz) = (pb[0] - pa[0], pb[1] - pa[1], pb[2] - pa[2])
+                length = dx * dx + dy * dy + dz * dz
+                if length > max_edge_squared and (wanted is None or wanted (pa, pb)):
+                    lengths[key] = length
+                else:
+                    settled.add (key)
+
+        room = max (max_vertices - len(points), 0)
+        keys = list (lengths)
+        if len(keys) > room:
+            keys = sorted (keys, key = lambda key: -lengths[key])[:room]
+            capped = True
+
+        middles = {}
+        for (a, b) in keys:
+            (pa, pb) = (points[a], points[b])
+            middles[(a, b)] = len(points)
+            points.append (((pa[0] + pb[0]) * 0.5, (pa[1] + pb[1]) * 0.5, (pa[2] + pb[2]) * 0.5))
+            normals.append (normalize (add (normals[a], normals[b])))
+
+        def middle (a, b):
+            return middles.get ((a, b) if a < b else (b, a))
+
+        refined = []
+        for triangle in triangles:
+            (a, b, c) = triangle
+            splits = (middle (a, b), middle (b, c), middle (c, a))
+            count = (splits[0] is not None) + (splits[1] is not None) + (splits[2] is not None)
+            if count == 0:
+                done.append (triangle)
+                continue
+
+            # turn the triangle so the split edges come first
+            while not (splits[0] is not None and (count == 3 or splits[count] is None)):
+                (a, b, c) = (b, c, a)
+                splits = splits[1:] + splits[:1]
+            (ab, bc, ca) = splits
+
+            if count == 1:
+                refined += [(a, ab, c), (ab, b, c)]
+            elif count == 2:
+                refined += [(ab, b, bc), (a, ab, bc), (a, bc, c)]
+            else:
+                refined += [(a, ab, ca), (ab, b, bc), (ca, bc, c), (ab, bc, ca)]
+
+        triangles = refined
+        if capped or not triangles:
+            break
+
+    return (points, normals, done + triangles, capped)
+
+# area weighted vertex normals from the triangles
+# runs once for every triangle of a refined mesh so the vector math is written out
+def mesh_normals (points, triangles):
+    xs = [0.0] * len(points)
+    ys = [0.0] * len(points)
+    zs = [0.0] * len(points)
+    for (a, b, c) in triangles:
+        (ax, ay, az) = points[a]
+        (ux, uy, uz) = (points[b][0] - ax, points[b][1] - ay, points[b][2] - az)
+        (vx, vy, vz) = (points[c][0] - ax, points[c][1] - ay, points[c][2] - az)
+        (nx, ny, nz) = (uy * vz - uz * vy, uz * vx - ux * vz, ux * vy - uy * vx)
+        for k in (a, b, c):
+            xs[k] += nx
+            ys[k] += ny
+            zs[k] += nz
+    return [normalize (n) if n != (0.0, 0.0, 0.0) else n for n in zip (xs, ys, zs)]
+
+# push every vertex inside the swept tools down along its normal to the bottom of the tool; each rail has its own tool radius
+# the tool is the ball swept between consecutive rail centers; for each nearby piece the vertex drops to where the normal leaves
+# the ball at the closest point on the piece, which is exact when the rail runs across the normal like it does on a surface
+# returns the gouged mesh, how many vertices moved and whether max_vertices stopped the refinement
+def gouge_mesh (points, normals, triangles, rails, radii, max_edge, max_vertices):
+    # each piece of every swept tool goes in the grid cells its box touches
+    smallest = min (radii)
+    grid = spatial_grid (smallest)
+    pieces = []
+    for (rail, radius) in zip (rails, radii):
+        centers = rail_centers (rail, radius, radius)
+        for (c0, c1) in zip (centers, centers[1:]):
+            low = tuple (min (c0[a], c1[a]) - radius for a in range(3))
+            high = tuple (max (c0[a], c1[a]) + radius for a in range(3))
+            grid.add (low, high, len(pieces))
+            d = sub (c1, c0)
+            pieces.append (c0 + d + (dot (d, d), radius * radius))
+
+    # the mesh only needs to be fine where a tool reaches, so edges are only split if a cell along them has a piece in it
+    inverse = 1.0 / smallest
+    cells = grid.cells
+    floor = math.floor
+    def near_tool (a, b):
+        (dx, dy, dz) = (b[0] - a[0], b[1] - a[1], b[2] - a[2])
+        steps = int (math.sqrt (dx * dx + dy * dy + dz * dz) * inverse) + 1
+        for j in range(steps + 1):
+            s = j / steps
+            if (floor ((a[0] + dx * s) * inverse), floor ((a[1] + dy * s) * inverse), floor ((a[2] + dz * s) * inverse)) in cells:
+                return True
+        return False
+
+    (points, normals, triangles) = weld_mesh (points, normals, triangles)
+    (points, normals, triangles, capped) = refine_mesh (points, normals, triangles, max_edge, max_vertices, near_tool)
+
+    # this loop runs for every vertex against every piece near it so the vector math is written out
+    moved = 0
+    gouged = list (points)
+    for (k, (v, n)) in enumerate (zip (points, normals)):
+        (vx, vy, vz) = v
+        (nx, ny, nz) = n
+        deepest = 0.0
+        for piece in cells.get ((floor (vx * inverse), floor (vy * inverse), floor (vz * inverse)), ()):
+            (x0, y0, z0, dx, dy, dz, length_squared, radius_squared) = pieces[piece]
+            (wx, wy, wz) = (vx - x0, vy - y0, vz - z0)
+            if length_squared > 0.0:
+                t = (wx * dx + wy * dy + wz * dz) / length_squared
+                t = 0.0 if t < 0.0 else (1.0 if t > 1.0 else t)
+                (wx, wy, wz) = (wx - dx * t, wy - dy * t, wz - dz * t)
+            ww = wx * wx + wy * wy + wz * wz
+            if ww < radius_squared:
+                wn = wx * nx + wy * ny + wz * nz
+                depth = wn + math.sqrt (wn * wn - ww + radius_squared)
+                if depth > deepest:
+                    deepest = depth
+        if deepest > 0.0:
+            gouged[k] = (vx - nx * deepest, vy - ny * deepest, vz - nz * deepest)
+            moved += 1
+
+    return (gouged, mesh_normals (gouged, triangles), triangles, moved, capped)
+
+# everything for one gouge that doesn't need fusion, from the sampled points and normals to the section circles
+# jobs are plain tuples so they can be sent to other processes: (points, normals, depth, (profile name, station count, samples), section tolerance, radius)
+def gouge_job (job):
+    rail = job_rail (job)
+    return (rail, job_sections (job, rail))
+
+# the two halves of a job, so they can be timed separately when the job runs in fusion's own process
+def job_rail (job):
+    (points, normals, depth, profile, section_tolerance, radius) = job
+    return compute_rail (points, normals, depth, taper_profile (*profile))
+
+def job_sections (job, rail):
+    (points, normals, depth, profile, section_tolerance, radius) = job
+    stations = adaptive_stations (rail, profile_stations (taper_profile (*profile)), section_tolerance)
+    return section_circles (rail, stations, radius)
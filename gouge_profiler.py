@@ -0,0 +1,71 @@
+# Author- Carl Bass
+# Description- times the phases of a gouge run per curve and counts api calls and features; plain python
+
+import collections
+import contextlib
+import csv
+import json
+import time
+
+class profiler:
+    def __init__(self):
+        self.start_time = time.perf_counter()
+
+        # total seconds and number of times through each phase, in the order the phases first ran
+        self.totals = collections.OrderedDict()
+        self.counts = collections.Counter()
+
+        # seconds in each phase for each curve
+        self.curves = collections.defaultdict (collections.Counter)
+
+        # anything else worth counting like api calls and features created
+        self.counters = collections.Counter()
+
+    # time the body of the with statement as a phase, charged to the curve if there is one
+    @contextlib.contextmanager
+    def phase (self, name, curve = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.totals[name] = self.totals.get (name, 0.0) + elapsed
+            self.counts[name] += 1
+            if curve is not None:
+                self.curves[curve][name] += elapsed
+
+    def count (self, name, n = 1):
+        self.counters[name] += n
+
+    def elapsed (self):
+        return time.perf_counter() - self.start_time
+
+    # lines of a table with the time in each phase and the counters
+    def summary (self):
+        total = self.elapsed()
+        lines = [f'{"phase":<16} {"calls":>7} {"sec":>9} {"%":>6}']
+        for (name, seconds) in self.totals.items():
+            lines.append (f'{name:<16} {self.counts[name]:>7} {seconds:>9.3f} {100.0 * seconds / max (total, 1.0e-9):>6.1f}')
+        lines.append (f'{"total":<16} {"":>7} {total:>9.3f}')
+        for (name, n) in self.counters.items():
+            lines.append (f'{name:<16} {n:>7}')
+        return lines
+
+    def write_json (self, path):
+        report = {
+            'total_seconds': self.elapsed(),
+            'phases': {name: {'calls': self.counts[name], 'seconds': seconds} for (name, seconds) in self.totals.items()},
+            'counters': dict (self.counters),
+            'curves': {str (curve): dict (phases) for (curve, phases) in sorted (self.curves.items())},
+        }
+        with open (path, 'w') as f:
+            json.dump (report, f, indent = 2)
+
+    # one row per curve with a column for the seconds in each phase
+    def write_csv (self, path):
+        phases = list (self.totals)
+        with open (path, 'w', newline = '') as f:
+            writer = csv.writer (f)
+            writer.writerow (['curve'] + phases)
+            for (curve, curve_phases) in sorted (self.curves.items()):
+                writer.writerow ([curve] + [f'{curve_phases.get (name, 0.0):.6f}' for name in phases])
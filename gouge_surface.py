@@ -2,7 +2,14 @@
 # Description- make surface gouges of specified radius tapering at both ends
 
 import adsk.core, adsk.fusion, adsk.cam, traceback
-import os
+import os, sys, time, math, collections, tempfile, json, hashlib
+import concurrent.futures, multiprocessing, multiprocessing.spawn, importlib, threading
+
+# the geometry lives in its own module so it can also be imported outside fusion
+try:
+    from . import gouge_geometry, gouge_profiler, gouge_export
+except ImportError:
+    import gouge_geometry, gouge_profiler, gouge_export
 
 # Global list to keep all event handlers in scope.
 handlers = []
@@ -15,7 +22,145 @@ ui  = app.userInterface
 debug = True
 gouge_surface = True
 tool_diameter = 0.25
-tool_radius = tool_diameter * 0.5
+
+# curves are sampled at this many points to start and refined wherever the tangent or surface normal turns more than the tolerance
+initial_samples = 9
+sampling_tolerance = 5.0
+
+# points within this distance of a face's bounding box might be on that face
+face_tolerance = 1.0e-3
+
+# curve ends closer than this are treated as connected
+chain_tolerance = 1.0e-4
+
+# extra loft sections are added between stations where the rail turns more than this many degrees
+section_tolerance = 30.0
+
+# depth profile along each gouge and the number of loft sections
+taper_name = 'sine'
+station_count = 3
+
+# depth fractions for the 'samples' taper profile, evenly spaced from start to end of each gouge
+profile_samples = '0, 0.7, 1, 0.7, 0'
+
+# the settings above are the defaults; a sketch curve can carry attributes in this group that change them for its own gouge
+# 'tool' names an entry in the tool table and 'diameter' (cm), 'depth_scale', 'taper' and 'samples' override single values
+# the tool table is a json file of {name: {same keys}}; the first curve of a chained path with any attributes decides for the path
+tool_attributes = 'gouge'
+tool_table_file = ''
+
+# everything about the tool for one gouge; gouges with the same tool share the profile work, clusters and cam operations
+gouge_tool = collections.namedtuple ('gouge_tool', ['diameter', 'depth_scale', 'taper'])
+
+# either cut every gouge separately or build all the gouges as tool bodies and cut them all at once
+cut_modes = ['One cut per curve', 'Single combined cut']
+cut_mode = cut_modes[0]
+
+# when doing a single combined cut, union this many tool bodies together before the cut; 1 means don't union
+# ignored when overlapping gouges are merged since then the clusters decide what gets joined
+union_chunk_size = 1
+
+# gouges that come within a tool diameter of each other are lofted as tool bodies, joined and cut with one boolean per cluster
+# instead of overlapping cuts one after another; in the combined cut mode each cluster is joined before the single cut
+merge_overlaps = True
+
+# a loft or cut that fails gets deleted and the gouge is tried again each of these ways in turn until one works
+# nothing fails while compute is deferred so the retries only happen with compute on
+recover_failures = True
+fallbacks = ['more sections', 'shortened rail', 'sweep', 'point ends']
+
+# fraction of the rail cut off each end for the shortened rail fallback
+rail_trim = 0.02
+
+# how long the cutting took the last time each cut mode ran so they can be compared
+cut_timings = {}
+
+# gouges are either lofted and cut from the b-rep or pressed into a tessellation of the faces and saved as a mesh body
+# the mesh engine is the only one that works on mesh bodies and skips the lofts and booleans when exact b-rep isn't needed
+engines = ['B-rep lofts', 'Mesh displacement']
+engine = engines[0]
+
+# longest mesh edge as a fraction of the tool diameter, and a limit on how far the mesh gets refined
+# it's plain python at about 30 us a vertex plus more where gouges overlap, so 1000 curves take around 10 sec at these settings
+mesh_edge_fraction = 0.5
+mesh_max_vertices = 250000
+
+# suspend design computation while all the gouge geometry is created and compute everything once at the end
+defer_compute = False
+
+# how long the last whole run took with and without deferred compute
+run_timings = {}
+
+# the rail and section math for each curve runs in this many processes once there are enough samples to make it worthwhile
+# the math is about 20 us a sample and starting the pool costs 0.1 to 0.5 sec plus about 6 us a sample to send the work over;
+# the threshold is an estimate for 4 cores since it's only been measured on one, so measure it with benchmark.py --calibrate-pool
+worker_count = max (1, (os.cpu_count() or 1) - 1)
+parallel_samples = 40000
+
+# the preview draws rails and tool tubes with custom graphics; these keep it interactive on big sketches
+# samples are kept for the last sketch and faces, and geometry for the last few tool settings
+preview_rings = 24
+preview_segments = 12
+preview_triangle_budget = 200000
+preview_cache_size = 8
+preview_samples = {}
+preview_geometry = collections.OrderedDict()
+
+# spinner ticks that come sooner than this after the last rebuild just redraw the last geometry,
+# and a timer fires a custom event that asks for one more preview so the newest settings get drawn once the ticks stop
+preview_interval = 0.25
+preview_event_id = 'gouge_preview_refresh'
+preview_time = 0.0
+preview_timer = None
+preview_command = None
+preview_graphics = None
+
+# the rails are the exact path the ball nose tool follows so they can be written out for machining instead of modeled
+# points are spaced so the polyline stays within the chordal tolerance of the rail; g-code merges straight runs within the merge tolerance
+export_formats = ['None', 'CSV', 'JSON', 'G-code']
+export_format = export_formats[0]
+export_folder = tempfile.gettempdir()
+export_tolerance = 0.001
+merge_tolerance = 0.0005
+
+# g-code feeds in mm/min and how far above the highest point rapids happen, in cm
+feed_rate = 1000.0
+plunge_rate = 300.0
+clearance = 0.5
+
+# make a manufacturing setup for each body with a trace operation along the rails
+cam_setup = False
+
+# once every gouge has been cut, remove the rail sketches and section disks the run left behind
+# a direct design doesn't need them any more so they're deleted; in a parametric design the lofts still refer to them
+# so the sketches stay hidden, the section bodies get a remove feature after the lofts and the run's timeline goes into one group
+clean_up = True
+
+# section disks that can't touch each other are packed into the same body, up to this many, so there are a few bodies to remove
+section_body_size = 250
+
+# keep per curve results in the design and only rebuild gouges whose curve, faces or tool settings changed
+incremental = False
+
+# time every phase of the run and write the report files to the report folder
+profile = False
+report_folder = tempfile.gettempdir()
+
+# profiler for the current run
+run_profile = gouge_profiler.profiler()
+
+# a batch runs a list of jobs, each a sketch and the faces or bodies to gouge with its own settings, without any dialogs
+# these are the settings a job file can change; anything a job changes is put back when it's done
+batch_settings = ('tool_diameter', 'gouge_surface', 'taper_name', 'station_count', 'profile_samples', 'tool_table_file', 'sampling_tolerance',
+                  'section_tolerance', 'engine', 'mesh_edge_fraction', 'cut_mode', 'union_chunk_size', 'merge_overlaps',
+                  'recover_failures', 'defer_compute', 'worker_count', 'incremental', 'export_format', 'export_tolerance',
+                  'cam_setup', 'clean_up', 'profile', 'debug')
+
+# a job file to run as soon as the add-in starts, for running a queue of jobs with nobody there
+batch_file = os.environ.get ('GOUGE_BATCH_FILE', '')
+
+# palette output is collected and written in one go since every write to the palette is slow
+palette_lines = []
 
 def run(context):
     
@@ -39,6 +184,19 @@ def run(context):
         gouge_button.commandCreated.add (gouge_command_created)
         handlers.append(gouge_command_created)
 
+        # Create a button for running a job file
+        batch_button = command_definitions.addButtonDefinition('gouge_batch', 'Gouge batch', 'Gouge surfaces from a job file', resource_folder)
+
+        batch_command_created = batch_created()
+        batch_button.commandCreated.add (batch_command_created)
+        handlers.append(batch_command_created)
+
+        # the event the preview timer fires when a skipped spinner tick still needs drawing
+        preview_event = app.registerCustomEvent (preview_event_id)
+        on_preview_refresh = preview_refresh()
+        preview_event.add (on_preview_refresh)
+        handlers.append(on_preview_refresh)
+
         # add the Moose Tools and the xy to uv button to the Tools tab
         utilities_tab = ui.allToolbarTabs.itemById('ToolsTab')
         if utilities_tab:
@@ -52,7 +210,19 @@ def run(context):
             control = moose_tools_panel.controls.addCommand(gouge_button)
             control.isPromoted = False
             control.isPromotedByDefault = False
+            moose_tools_panel.controls.addCommand(batch_button)
             debug_print ('Moose Tools installed')
+            flush_palette()
+
+        # nobody is there to close a dialog, so whatever goes wrong with the batch only goes in the palette and the report
+        if batch_file:
+            try:
+                run_batch_file (batch_file)
+            except:
+                palette_print (f'batch {batch_file} failed: {traceback.format_exc().splitlines()[-1]}')
+                debug_print (traceback.format_exc())
+            finally:
+                flush_palette()
 
     except:
         if ui:
@@ -77,6 +247,35 @@ class input_changed (adsk.core.InputChangedEventHandler):
         except:
             ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
 
+# Event handler for the commandCreated event of the batch button
+class batch_created (adsk.core.CommandCreatedEventHandler):
+    def __init__(self):
+        super().__init__()
+    def notify(self, args):
+        event_args = adsk.core.CommandCreatedEventArgs.cast(args)
+
+        on_execute = batch_executed()
+        event_args.command.execute.add(on_execute)
+        handlers.append(on_execute)
+
+# Event handler for the execute event of the batch button; the file dialog is the only one, the jobs run without any
+class batch_executed (adsk.core.CommandEventHandler):
+    def __init__(self):
+        super().__init__()
+    def notify(self, args):
+        try:
+            file_dialog = ui.createFileDialog()
+            file_dialog.title = 'Gouge job file'
+            file_dialog.filter = 'Job files (*.json)'
+            if file_dialog.showOpen() == adsk.core.DialogResults.DialogOK:
+                run_batch_file (file_dialog.filename)
+
+        except:
+            ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
+
+        finally:
+            flush_palette()
+
 # Event handler for the commandCreated event.
 class command_created (adsk.core.CommandCreatedEventHandler):
     def __init__(self):
@@ -92,6 +291,11 @@ class command_created (adsk.core.CommandCreatedEventHandler):
         command.execute.add(onExecute)
         handlers.append(onExecute)
 
+        # Connect to the execute preview event
+        on_preview = command_preview()
+        command.executePreview.add(on_preview)
+        handlers.append(on_preview)
+
         # Connect to the execute event
         on_input_changed = input_changed()
         command.inputChanged.add(on_input_changed)
@@ -102,10 +306,12 @@ class command_created (adsk.core.CommandCreatedEventHandler):
         sketch_selection_input.addSelectionFilter('Sketches')
         sketch_selection_input.setSelectionLimits(1,1)
 
-        # create the face selection input widget
-        face_selection_input = inputs.addSelectionInput('face_select', 'Face', 'Select the face')
+        # create the face selection input widget; whole bodies can be picked too
+        face_selection_input = inputs.addSelectionInput('face_select', 'Faces', 'Select the faces or bodies')
         face_selection_input.addSelectionFilter('Faces')
-        face_selection_input.setSelectionLimits(1,1)
+        face_selection_input.addSelectionFilter('SolidBodies')
+        face_selection_input.addSelectionFilter('MeshBodies')
+        face_selection_input.setSelectionLimits(1,0)
 
         # create tool diameter input widget
         inputs.addFloatSpinnerCommandInput ('tool_diameter', 'Tool diameter', 'in', 0.05 , 1.0 , .01, tool_diameter)
@@ -113,396 +319,1740 @@ class command_created (adsk.core.CommandCreatedEventHandler):
         # create swap uv checkbox widget
         inputs.addBoolValueInput('gouge_surface', 'Gouge surface', True, '', gouge_surface)
 
-        # create debug checkbox widget
-        inputs.addBoolValueInput('debug', 'Debug', True, '', debug)
-
-# Event handler for the execute event.
-class command_executed (adsk.core.CommandEventHandler):
-    def __init__(self):
-        super().__init__()
-    def notify(self, args):
-        global debug
-        global gouge_surface
-        global tool_diameter
-        global tool_radius
-
-        try:
-            design = app.activeProduct
-
-            # get current command
-            command = args.firingEvent.sender
-
-            for input in command.commandInputs:
-                if (input.id == 'sketch_select'):
-                    input_sketch = input.selection(0).entity
-                elif (input.id == 'face_select'):
-                    face = input.selection(0).entity
-                elif (input.id == 'tool_diameter'):
-                    tool_diameter = input.value    
-                    tool_radius = tool_diameter * 0.5
-                    debug_print (f'tool diameter = {tool_diameter:.3f} cm')
-                elif (input.id == 'gouge_surface'):
-                    gouge_surface = input.value           
-                elif (input.id == 'debug'):
-                    debug = input.value           
-                else: 
-                    debug_print (f'OOOPS --- too much input')
-
-            root_component = design.rootComponent
-
-            debug_print (f'----------------- {input_sketch.name} -----------------')
-            debug_print (f'face: {face.objectType}')
-
-            parent_body = face.body
-            parent_component = parent_body.parentComponent
-
-            sketches = parent_component.sketches
-
-            face_evaluator = face.evaluator
-
-            sketch_curves = input_sketch.sketchCurves
-            debug_print (f'sketch has {sketch_curves.count} curves')
-
-            # only process fixed splines ; more can be added later
-            sketch_fixed_splines = input_sketch.sketchCurves.sketchFixedSplines
-            debug_print (f'Processing {sketch_fixed_splines.count} fixed splines')
-
-            # get construction planes collection
-            construction_planes = parent_component.constructionPlanes
-            plane_input = construction_planes.createInput()
-
-            saved_rails = []
-
-            # rail sketch should exist in the same coordinate system as the parent component of the face chosen
-            rail_sketch = sketches.add (parent_component.xYConstructionPlane)
-            rail_sketch.name = 'rail sketch'
-
-            debug_print ('------------------------------------')
-
-            # tmp_vector will be used to calculate distance along projected normals to define circle
-            tmp_vector = adsk.core.Vector3D.create ()
-
-            # these points will be used in the calculation for each gouge; just allocate them once
-            mid_p1 = adsk.core.Point3D.create ()                    
-            start_normal_point = adsk.core.Point3D.create()
-            mid_normal_point = adsk.core.Point3D.create()
-            end_normal_point = adsk.core.Point3D.create()
-            start_p1_local = adsk.core.Point3D.create()
-            mid_p1_local = adsk.core.Point3D.create()
-            end_p1_local = adsk.core.Point3D.create()
-
-
-            i = 0
-            for spline in sketch_fixed_splines:
-                debug_print (f'Creating toolpath {i}')
-
-                tmp_sketch = sketches.add (parent_component.xYConstructionPlane)
-                tmp_sketch.name = f'tmp sketch {i}'
-
-                # get the evaluator for this curve
-                curve_evaluator = spline.evaluator
-
-                # get the parametric endpoints
-                (status, start_p, end_p) = curve_evaluator.getParameterExtents()                
-
-                # get endpoints in cartesian coordinates
-                (status, start_p0, end_p0) = curve_evaluator.getEndPoints()
-
-                # calculate mid_point in cartesian space
-                (status, length) = curve_evaluator.getLengthAtParameter (start_p, end_p)
-                (status, mid_p) = curve_evaluator.getParameterAtLength (start_p, length * 0.5)
-
-                # convert parameter into cartesian coordinates for all three points
-                (status, mid_p0) = curve_evaluator.getPointAtParameter (mid_p)
-
-                (status, mid_normal) = face_evaluator.getNormalAtPoint (mid_p0)
-
-                # figure out depth of cut for middle of the curve; it's tool radius down along the midpoint normal
-                gouge_vector = adsk.core.Vector3D.create ()   
-                
-                gouge_vector.x = -mid_normal.x * tool_radius
-                gouge_vector.y = -mid_normal.y * tool_radius
-                gouge_vector.z = -mid_normal.z * tool_radius
-                
-                # point in middle of curve at depth of gouge
-                mid_p1.x = mid_p0.x + gouge_vector.x 
-                mid_p1.y = mid_p0.y + gouge_vector.y 
-                mid_p1.z = mid_p0.z + gouge_vector.z 
-
-                tmp_sketch_points = tmp_sketch.sketchPoints
-                tmp_sketch_lines = tmp_sketch.sketchCurves.sketchLines
-
-                # add points at end to use in loft
-                loft_start_point = tmp_sketch_points.add (start_p0)
-                loft_end_point = tmp_sketch_points.add (end_p0)
-                
-                # add midpoint line to use in surface loft
-                mid_line = tmp_sketch_lines.addByTwoPoints (mid_p0, mid_p1)
-                
-                # define the input for a surface loft that will create the toolpath
-                surface_loft_features = parent_component.features.loftFeatures
-                surface_loft_input = surface_loft_features.createInput(adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-                surface_loft_input.isSolid = False
-
-                surface_loft_sections = surface_loft_input.loftSections
-                surface_loft_sections.add (loft_start_point)
-                surface_loft_sections.add (mid_line)
-                surface_loft_sections.add (loft_end_point)
-                
-                surface_loft_input.isClosed = False
-
-                surface_loft_input.centerLineOrRails.addRail (spline)
-
-                # create the loft
-                surface_loft_feature = surface_loft_features.add(surface_loft_input)
-                surface_loft_feature.bodies.item(0).name = f'surface {i}'                                
-
-                surface_loft_face = surface_loft_feature.faces.item(0)
-                if surface_loft_face.edges.count == 2:
-                    edge0 = surface_loft_face.edges.item(0)
-                    edge1 = surface_loft_face.edges.item(1)
-                
-                # measure distance between two edges of the surface loft and the deepest point in the gouge (mid_p1)
-                edge0_distance = app.measureManager.measureMinimumDistance (edge0, mid_p1).value
-                edge1_distance = app.measureManager.measureMinimumDistance (edge1, mid_p1).value
-
-                # find bottom curve and make a copy
-                if  edge0_distance < edge1_distance:
-                    saved_rails.append (edge0.geometry.copy())
-                else:
-                    saved_rails.append (edge1.geometry.copy())
-
-                # add the toolpath curve to the rail sketch which will get processed later
-                toolpath = rail_sketch.sketchCurves.sketchFixedSplines.addByNurbsCurve (saved_rails[i])
-
-                # get rid of the surface loft since we got the bottom curve which is all we needed
-                surface_loft_feature.deleteMe()
-
-                debug_print (f'GOuging along toolpath {i}')
-                
-                # get the parametric endpoints
-                (status, start_p, end_p) = toolpath.evaluator.getParameterExtents()                    
-                
-                # get endpoints in cartesian coordinates
-                (status, start_p0, end_p0) = toolpath.evaluator.getEndPoints()
-
-                # calculate mid_point in cartesian space
-                (status, length) = toolpath.evaluator.getLengthAtParameter (start_p, end_p)
-                (status, mid_p) = toolpath.evaluator.getParameterAtLength (start_p, length * 0.5)
-
-                # convert parameter into cartesian coordinates for all midpoint
-                (status, mid_p0) = toolpath.evaluator.getPointAtParameter (mid_p)
-
-                # get normals to surface at middle and both ends of toolpath curve
-                (status, start_normal) = face_evaluator.getNormalAtPoint (start_p0)
-                (status, mid_normal) = face_evaluator.getNormalAtPoint (mid_p0)
-                (status, end_normal) = face_evaluator.getNormalAtPoint (end_p0)
-
-                # make three temporary construction planes and sketches along the toolpath curve
+        # create taper profile dropdown widget
+        taper_input = inputs.addDropDownCommandInput('taper_profile', 'Taper profile', adsk.core.DropDownStyles.TextListDropDownStyle)
+        for name in gouge_geometry.taper_profile_names:
+            taper_input.listItems.add (name, name == taper_name)
 
-                # create construction plane at beginning of path
-                plane_input.setByDistanceOnPath (toolpath, adsk.core.ValueInput.createByReal(0.0))
-                start_construction_plane = construction_planes.add (plane_input)
-                start_construction_plane.name = (f'start {i}')
+        # create profile samples widget; only used by the samples taper profile
+        inputs.addStringValueInput('profile_samples', 'Profile samples', profile_samples)
 
-                # create construction plane at middle of path
-                plane_input.setByDistanceOnPath (toolpath, adsk.core.ValueInput.createByReal(0.5))
-                mid_construction_plane = construction_planes.add (plane_input)
-                mid_construction_plane.name = (f'mid {i}')
+        # create tool table widget; a json file of tools that sketch curves can name
+        inputs.addStringValueInput('tool_table_file', 'Tool table', tool_table_file)
 
-                # create construction plane at end of path
-                plane_input.setByDistanceOnPath (toolpath, adsk.core.ValueInput.createByReal(1.0))
-                end_construction_plane = construction_planes.add (plane_input)
-                end_construction_plane.name = (f'end {i}')
+        # create station count widget
+        inputs.addIntegerSpinnerCommandInput('station_count', 'Loft sections', 2, 50, 1, station_count)
 
-                # create a sketch on each of the newly created construction planes
-                start_sketch = sketches.add (start_construction_plane)
-                start_sketch.name = f'start sketch {i}'
+        # create sampling tolerance widget in degrees
+        inputs.addFloatSpinnerCommandInput('sampling_tolerance', 'Sampling tolerance (deg)', '', 0.5, 45.0, 0.5, sampling_tolerance)
 
-                mid_sketch = sketches.add (mid_construction_plane)
-                mid_sketch.name = f'mid sketch {i}'
+        # create section tolerance widget in degrees
+        inputs.addFloatSpinnerCommandInput('section_tolerance', 'Section tolerance (deg)', '', 5.0, 180.0, 5.0, section_tolerance)
 
-                end_sketch = sketches.add (end_construction_plane)
-                end_sketch.name = f'end sketch {i}'
+        # create engine dropdown widget
+        engine_input = inputs.addDropDownCommandInput('engine', 'Engine', adsk.core.DropDownStyles.TextListDropDownStyle)
+        for name in engines:
+            engine_input.listItems.add (name, name == engine)
 
-                # make normal at start_point into sketch line and project it into start_sketch
-                start_p0_local = start_sketch.modelToSketchSpace (start_p0)
+        # create mesh edge widget as a fraction of the tool diameter
+        inputs.addFloatSpinnerCommandInput('mesh_edge_fraction', 'Mesh edge (x tool)', '', 0.05, 1.0, 0.05, mesh_edge_fraction)
 
-                start_normal_point.x = start_p0.x + start_normal.x
-                start_normal_point.y = start_p0.y + start_normal.y
-                start_normal_point.z = start_p0.z + start_normal.z
+        # create cut mode dropdown widget
+        cut_mode_input = inputs.addDropDownCommandInput('cut_mode', 'Cut mode', adsk.core.DropDownStyles.TextListDropDownStyle)
+        for mode in cut_modes:
+            cut_mode_input.listItems.add (mode, mode == cut_mode)
 
-                start_normal_point_local = start_sketch.modelToSketchSpace (start_normal_point)
-                tmp_point = start_sketch.sketchPoints.add (start_normal_point_local)
+        # create union chunk size widget
+        inputs.addIntegerSpinnerCommandInput('union_chunk_size', 'Union chunk size', 1, 1000, 1, union_chunk_size)
 
-                entities = []
-                entities = start_sketch.project (tmp_point)
-                projected_start_normal = entities[0]
-                tmp_point.isReference = False
+        # create merge overlaps checkbox widget
+        inputs.addBoolValueInput('merge_overlaps', 'Merge overlapping gouges', True, '', merge_overlaps)
 
-                tmp_vector.x = projected_start_normal.geometry.x - start_p0_local.x
-                tmp_vector.y = projected_start_normal.geometry.y - start_p0_local.y
-                tmp_vector.z = projected_start_normal.geometry.z - start_p0_local.z
+        # create recover failures checkbox widget
+        inputs.addBoolValueInput('recover_failures', 'Retry failed gouges', True, '', recover_failures)
 
-                tmp_vector.scaleBy (tool_diameter / tmp_vector.length )
+        # create defer compute checkbox widget
+        inputs.addBoolValueInput('defer_compute', 'Defer compute', True, '', defer_compute)
 
-                # find point in sketch coordinates that is a tool diameter away from surface along the projected normal 
-                start_p1_local.x = start_p0_local.x + tmp_vector.x
-                start_p1_local.y = start_p0_local.y + tmp_vector.y
-                start_p1_local.z = start_p0_local.z + tmp_vector.z
+        # create worker count widget
+        inputs.addIntegerSpinnerCommandInput('worker_count', 'Worker processes', 1, 64, 1, worker_count)
 
-                start_sketch.sketchCurves.sketchCircles.addByTwoPoints (start_p0_local, start_p1_local)
+        # create incremental checkbox widget
+        inputs.addBoolValueInput('incremental', 'Only rebuild changes', True, '', incremental)
 
-                # do same thing for midpoint
+        # create export format dropdown widget
+        export_input = inputs.addDropDownCommandInput('export_format', 'Export toolpaths', adsk.core.DropDownStyles.TextListDropDownStyle)
+        for name in export_formats:
+            export_input.listItems.add (name, name == export_format)
 
-                # make normal at mid_point into sketch line and project it into mid_sketch
-                mid_p0_local = mid_sketch.modelToSketchSpace (mid_p0)
+        # create export tolerance widget
+        inputs.addFloatSpinnerCommandInput('export_tolerance', 'Chordal tolerance', 'in', 0.0001, 0.1, 0.0001, export_tolerance)
 
-                mid_normal_point.x = mid_p0.x + mid_normal.x
-                mid_normal_point.y = mid_p0.y + mid_normal.y
-                mid_normal_point.z = mid_p0.z + mid_normal.z
+        # create cam setup checkbox widget
+        inputs.addBoolValueInput('cam_setup', 'CAM setup', True, '', cam_setup)
 
-                mid_normal_point_local = mid_sketch.modelToSketchSpace (mid_normal_point)
-                tmp_point = mid_sketch.sketchPoints.add (mid_normal_point_local)
+        # create clean up checkbox widget
+        inputs.addBoolValueInput('clean_up', 'Clean up', True, '', clean_up)
 
-                entities = []
-                entities = mid_sketch.project (tmp_point)
-                projected_mid_normal = entities[0]
-                tmp_point.isReference = False
+        # create profile checkbox widget
+        inputs.addBoolValueInput('profile', 'Profile', True, '', profile)
 
-                tmp_vector.x = projected_mid_normal.geometry.x - mid_p0_local.x
-                tmp_vector.y = projected_mid_normal.geometry.y - mid_p0_local.y
-                tmp_vector.z = projected_mid_normal.geometry.z - mid_p0_local.z
-
-                tmp_vector.scaleBy (tool_diameter / tmp_vector.length )
-
-                mid_p1_local.x = mid_p0_local.x + tmp_vector.x
-                mid_p1_local.y = mid_p0_local.y + tmp_vector.y
-                mid_p1_local.z = mid_p0_local.z + tmp_vector.z
-
-                mid_sketch.sketchCurves.sketchCircles.addByTwoPoints (mid_p0_local, mid_p1_local)
+        # create debug checkbox widget
+        inputs.addBoolValueInput('debug', 'Debug', True, '', debug)
 
-                # and again at the other end of the curve
-               
-                # make normal at end_point into sketch line and project it into end_sketch
-                end_p0_local = end_sketch.modelToSketchSpace (end_p0)
+# Event handler for the executePreview event; draws the gouges with custom graphics instead of building anything
+class command_preview (adsk.core.CommandEventHandler):
+    def __init__(self):
+        super().__init__()
+    def notify(self, args):
+        global preview_command
+        try:
+            event_args = adsk.core.CommandEventArgs.cast(args)
+            preview_command = event_args.command
 
-                end_normal_point.x = end_p0.x + end_normal.x
-                end_normal_point.y = end_p0.y + end_normal.y
-                end_normal_point.z = end_p0.z + end_normal.z
+            # the dialog's values only become the defaults for next time on execute, so the preview puts the settings back after drawing
+            saved_settings = {name: globals()[name] for name in batch_settings}
+            try:
+                (input_sketch, faces) = read_inputs (event_args.command.commandInputs)
+                if input_sketch and faces:
+                    draw_preview (input_sketch, faces)
+            finally:
+                apply_settings (saved_settings)
 
-                end_normal_point_local = end_sketch.modelToSketchSpace (end_normal_point)
-                tmp_point = end_sketch.sketchPoints.add (end_normal_point_local)
+            # the preview is only graphics so execute still has to run
+            event_args.isValidResult = False
 
-                entities = []
-                entities = end_sketch.project (tmp_point)
-                projected_end_normal = entities[0]
-                tmp_point.isReference = False
+        except:
+            ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
 
-                tmp_vector.x = projected_end_normal.geometry.x - end_p0_local.x
-                tmp_vector.y = projected_end_normal.geometry.y - end_p0_local.y
-                tmp_vector.z = projected_end_normal.geometry.z - end_p0_local.z
+        finally:
+            flush_palette()
 
-                tmp_vector.scaleBy (tool_diameter / tmp_vector.length )
+# Event handler for the preview timer's custom event; runs the preview again on fusion's thread
+class preview_refresh (adsk.core.CustomEventHandler):
+    def __init__(self):
+        super().__init__()
+    def notify(self, args):
+        try:
+            if preview_command and preview_command.isValid:
+                preview_command.doExecutePreview()
+        except:
+            ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))
 
-                end_p1_local.x = end_p0_local.x + tmp_vector.x
-                end_p1_local.y = end_p0_local.y + tmp_vector.y
-                end_p1_local.z = end_p0_local.z + tmp_vector.z
+# Event handler for the execute event.
+class command_executed (adsk.core.CommandEventHandler):
+    def __init__(self):
+        super().__init__()
+    def notify(self, args):
+        try:
 
-                end_sketch.sketchCurves.sketchCircles.addByTwoPoints (end_p0_local, end_p1_local)
+            # get current command
+            command = args.firingEvent.sender
+            clear_preview()
 
-                i = i + 1
-            
-            # take the saved rails and the circles in the sketches to create lofts that gouge the surface
-                
-            debug_print (f'rail sketch has {rail_sketch.sketchCurves.count} curve(s)')
+            (input_sketch, faces) = read_inputs (command.commandInputs)
+            gouge (input_sketch, faces)
 
-            i = 0
-            for r in rail_sketch.sketchCurves.sketchFixedSplines:
+        except:
+            ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))	
 
-                # define the input for a solid loft that gouges the surface
-                solid_loft_features = parent_component.features.loftFeatures
-                solid_loft_input = solid_loft_features.createInput(adsk.fusion.FeatureOperations.CutFeatureOperation)
-                solid_loft_input.isSolid = True
+        finally:
+            flush_palette()
 
-                start_sketch = sketches.itemByName (f'start sketch {i}')
-                mid_sketch = sketches.itemByName (f'mid sketch {i}')
-                end_sketch = sketches.itemByName (f'end sketch {i}')
-                start_circle_profile = start_sketch.profiles.item(0)
-                middle_circle_profile = mid_sketch.profiles.item(0)
-                end_circle_profile = end_sketch.profiles.item(0)
+# gouge the faces along every curve in the sketch with the current settings
+# anything that goes wrong is raised to the caller, which is the command or a batch run
+def gouge (input_sketch, faces):
+    global run_profile
 
-                solid_loft_sections = solid_loft_input.loftSections
-                solid_loft_sections.add(start_circle_profile)
-                solid_loft_sections.add(middle_circle_profile)
-                solid_loft_sections.add(end_circle_profile)
+    run_start_time = time.perf_counter()
+    run_profile = gouge_profiler.profiler()
+    design = input_sketch.parentComponent.parentDesign
+    objects = run_objects (design)
 
-                solid_loft_input.centerLineOrRails.addRail (r)
+    try:
+        debug_print (f'default tool diameter = {tool_diameter:.3f} cm')
+
+        # nothing gets recomputed as features are added until compute is turned back on
+        if defer_compute:
+            design.isComputeDeferred = True
+
+        debug_print (f'----------------- {input_sketch.name} -----------------')
+
+        # gouges can run over any number of faces and bodies; the face set figures out which face each point is on
+        with run_profile.phase ('face index'):
+            surface = surface_set (faces)
+
+        # mesh bodies can only be gouged by the mesh engine
+        mesh_engine = engine == engines[1] or isinstance (surface, mesh_set)
+        debug_print (f'{len(surface.faces)} faces on {len(surface.bodies)} bodies')
+
+        sketch_curves = input_sketch.sketchCurves
+        debug_print (f'sketch has {sketch_curves.count} curves')
+
+        # every kind of sketch curve is turned into nurbs and connected curves are chained into a single path
+        with run_profile.phase ('curve ingest'):
+            (paths, sources) = curve_paths (sketch_curves)
+        debug_print (f'Processing {len(paths)} paths')
+
+        # each path gets its tool from its curves' attributes, falling back on the command's settings
+        with run_profile.phase ('tools'):
+            table = load_tool_table (tool_table_file)
+            tools = [resolve_tool (tool_values (source), table, f'toolpath {k}') for (k, source) in enumerate (sources)]
+            tool_groups = collections.OrderedDict()
+            for (k, tool) in enumerate (tools):
+                tool_groups.setdefault (tool, []).append (k)
+        for (tool, group) in tool_groups.items():
+            debug_print (f'{len(group)} paths with a {tool.diameter:.3f} cm tool at {tool.depth_scale:.2f} depth, {tool.taper.name} taper')
+        run_profile.count ('tools', len(tool_groups))
+
+        saved_rails = [None] * len(paths)
+        circles = [None] * len(paths)
+        body_gouges = {}
+        rail_bodies = [0] * len(paths)
+
+        debug_print ('------------------------------------')
+
+        # all the curve and face evaluation goes through the sampler in batches
+        sampler = curve_sampler (surface)
+        tolerance = math.radians (sampling_tolerance)
+
+        # on incremental runs whatever is left from earlier runs gets reused if nothing about it changed
+        # the mesh engine rebuilds its mesh from every rail each time so only the lofts are cached
+        cache = gouge_cache (input_sketch, design) if incremental and not mesh_engine else None
+        if cache:
+            with run_profile.phase ('cache'):
+                keys = [path_key (path, [list (tool), sampling_tolerance, section_tolerance]) for (path, tool) in zip (paths, tools)]
+
+                # the key doesn't know about the target so a gouge cut into a body that isn't selected now is stale too
+                current = set (key for key in keys if key not in cache.entries or surface.body_index (cache.body (key)) is not None)
+                removed = cache.remove_stale (current)
+                objects.mark_timeline()
+            debug_print (f'removed {removed} stale gouges')
+
+        # fusion has to be called from this thread so the sampling happens here and the rest of the math goes to the workers
+        jobs = []
+        job_indices = []
+
+        # paths are visited a tool at a time so each worker mostly sees one profile and works out its stations once
+        for i in [k for group in tool_groups.values() for k in group]:
+            path = paths[i]
+            if cache and keys[i] in cache.entries:
+                # the rail and sections come straight from the cache and only get rebuilt if the cut is gone
+                saved_rails[i] = cache.rail (keys[i])
+                circles[i] = cache.circles (keys[i])
+                run_profile.count ('cached curves')
+
+                rail_bodies[i] = surface.body_index (cache.body (keys[i]))
+                if cache.is_built (keys[i]):
+                    debug_print (f'toolpath {i} unchanged')
+                else:
+                    debug_print (f'Rebuilding toolpath {i}')
+                    body_gouges.setdefault (rail_bodies[i], []).append (i)
 
-                participant_bodies = []
-                participant_bodies.append (parent_body)
-                solid_loft_input.participantBodies = participant_bodies
+            else:
+                debug_print (f'Creating toolpath {i}')
 
-                if gouge_surface:               
-                    solid_loft_feature = solid_loft_features.add(solid_loft_input)
+                # sample the curve and the face normals under it; the rail gets computed from these instead of lofting a surface to find it
+                surface.hits.clear()
+                with run_profile.phase ('sampling', i):
+                    (points, normals) = sampler.sample_path (path, tolerance)
+
+                # a zero length curve has nothing to fit a rail along so it's left out rather than failing the run
+                if not gouge_geometry.has_length (points):
+                    palette_print (f'skipping toolpath {i}: the curve has no length')
+                    run_profile.count ('skipped curves')
+                    continue
+
+                radius = tools[i].diameter * 0.5
+                jobs.append ((points, normals, radius * tools[i].depth_scale, tuple (tools[i].taper), math.radians (section_tolerance), radius))
+                job_indices.append (i)
+                debug_print (f'toolpath {i}: {len(points)} samples')
+
+                # the gouge gets cut from the body that most of its samples landed on
+                rail_bodies[i] = surface.path_body()
+                body_gouges.setdefault (rail_bodies[i], []).append (i)
+
+        debug_print (f'sampling took {sampler.api_calls + surface.api_calls} api calls for {len(paths)} curves')
+
+        # offset the samples into rails and orient the tool circles from each rail's own frame
+        for (index, (rail, rail_circles)) in zip (job_indices, compute_gouges (jobs, worker_count, job_indices)):
+            saved_rails[index] = rail
+            circles[index] = rail_circles
+        run_profile.count ('api calls', sampler.api_calls + surface.api_calls)
+        run_profile.count ('curves', len(paths))
+
+        # every rail goes out, including ones that were cached and don't need rebuilding
+        if export_format != export_formats[0]:
+            with run_profile.phase ('export'):
+                export_toolpaths ([rail for rail in saved_rails if rail], [tool.diameter * 0.5 for (rail, tool) in zip (saved_rails, tools) if rail], input_sketch.name)
+
+        if cam_setup:
+            with run_profile.phase ('cam setup'):
+                for body_index in sorted (set (b for (rail, b) in zip (saved_rails, rail_bodies) if rail)):
+                    body_tools = collections.OrderedDict()
+                    for (rail, tool, b) in zip (saved_rails, tools, rail_bodies):
+                        if rail and b == body_index:
+                            body_tools.setdefault (tool.diameter, []).append (rail)
+                    cam_toolpaths (surface.bodies[body_index], body_tools)
+
+        # take the saved rails and the section circles to create lofts that gouge each body
+        cut_start_time = time.perf_counter()
+
+        leftovers = []
+        for (body_index, gouge_indices) in body_gouges.items():
+            body = surface.bodies[body_index]
+            if mesh_engine:
+                debug_print (f'pressing {len(gouge_indices)} toolpaths into a mesh of {body.name}')
+                if gouge_surface:
+                    gouge_mesh_body (surface, body_index, [saved_rails[k] for k in gouge_indices], [tools[k].diameter * 0.5 for k in gouge_indices])
+                continue
+
+            debug_print (f'gouging {len(gouge_indices)} toolpaths into {body.name}')
+            (body_leftovers, created, shared) = gouge_body (body, gouge_indices, [saved_rails[k] for k in gouge_indices], [circles[k] for k in gouge_indices])
+            leftovers += body_leftovers
+
+            # remember what was built for each curve so the next incremental run can reuse it
+            if cache and gouge_surface:
+                body_token = body.entityToken
+                for (index, entities) in created.items():
+                    cache.store (keys[index], saved_rails[index], circles[index], body_token, entities, shared[index])
+
+        # keep track of how long cutting took so the two cut modes can be compared
+        if gouge_surface:
+            built = sum (len(gouge_indices) for gouge_indices in body_gouges.values())
+            cut_timings[engines[1] if mesh_engine else cut_mode] = (built, time.perf_counter() - cut_start_time)
+            for (mode, (count, seconds)) in cut_timings.items():
+                debug_print (f'{mode}: {count} gouges in {seconds:.2f} sec ({seconds / max (count, 1):.3f} sec per gouge)')
+
+        # clean up a little more
+        input_sketch.isVisible = False
+        objects.add (leftovers)
+        for leftover in leftovers:
+            leftover.isVisible = False
+
+        # single compute of everything that was deferred
+        if design.isComputeDeferred:
+            design.isComputeDeferred = False
+
+        # the cache finds what's built by the rail curves so those have to stay on incremental runs
+        if clean_up and gouge_surface:
+            with run_profile.phase ('clean up'):
+                objects.clean (input_sketch.name, keep_sketches = cache is not None)
+
+        run_timings[defer_compute] = time.perf_counter() - run_start_time
+        for (deferred, seconds) in run_timings.items():
+            debug_print (f'compute {"deferred" if deferred else "on"}: {seconds:.2f} sec')
+
+        if profile:
+            report_profile (run_profile, input_sketch.name)
+
+        return run_profile
+
+    finally:
+        # never leave the design with compute turned off
+        if design.isComputeDeferred:
+            design.isComputeDeferred = False
+
+# the intermediate objects a run makes and the size of the design before it started
+class run_objects:
+    def __init__(self, design):
+        self.design = design
+        self.parametric = design.designType == adsk.fusion.DesignTypes.ParametricDesignType
+        self.counts = design_counts (design)
+        self.entities = []
+        self.mark_timeline()
+
+    # the run's timeline entries start after whatever is in the timeline now
+    def mark_timeline (self):
+        self.timeline_start = self.design.timeline.count if self.parametric else 0
+
+    def add (self, entities):
+        self.entities += entities
+
+    # delete, or remove and group, the intermediates as long as every gouge worked, and report how the size of the design changed
+    def clean (self, name, keep_sketches = False):
+        failures = run_profile.counters['failed gouges'] + run_profile.counters['failed cuts']
+        if failures:
+            palette_print (f'{failures} gouges or cuts failed so the rail sketches and sections are left in place')
+        elif self.parametric:
+            # the lofts are already built from the sections so the section bodies can be removed from here on
+            removed = 0
+            for entity in self.entities:
+                if entity.isValid and entity.objectType == adsk.fusion.BRepBody.classType():
+                    entity.parentComponent.features.removeFeatures.add (entity)
+                    removed += 1
+            run_profile.count ('removed', removed)
+
+            timeline = self.design.timeline
+            if timeline.count - self.timeline_start > 1:
+                group = timeline.timelineGroups.add (self.timeline_start, timeline.count - 1)
+                group.name = f'gouge {name}'
+                group.isCollapsed = True
+        else:
+            removed = 0
+            for entity in self.entities:
+                if entity.isValid and not (keep_sketches and entity.objectType == adsk.fusion.Sketch.classType()):
+                    entity.deleteMe()
+                    removed += 1
+            run_profile.count ('removed', removed)
+
+        after = design_counts (self.design)
+        for (kind, count) in after.items():
+            palette_print (f'{kind}: {self.counts[kind]} before, {count} after')
+
+# how many of each kind of object are in the design
+def design_counts (design):
+    counts = collections.Counter()
+    for component in design.allComponents:
+        counts['sketches'] += component.sketches.count
+        counts['bodies'] += component.bRepBodies.count
+        counts['mesh bodies'] += component.meshBodies.count
+        counts['construction planes'] += component.constructionPlanes.count
+    if design.designType == adsk.fusion.DesignTypes.ParametricDesignType:
+        counts['timeline entries'] = design.timeline.count
+    return counts
+
+# a job file is either a list of jobs or {"settings": {...}, "jobs": [...]} where the settings apply to every job
+# each job is {"document": name, "sketch": name, "bodies": [names], "faces": [entity tokens], "tool_diameter": cm, "settings": {...}}
+# the document defaults to the active one and the job needs bodies or faces or both
+# a job file is a list of jobs or a dict with the jobs and the settings they share
+# a file that can't be read gets a report with the error rather than a dialog since batches usually run with nobody there
+def run_batch_file (path):
+    try:
+        with open (path) as f:
+            jobs = json.load (f)
+        settings = {}
+        if isinstance (jobs, dict):
+            settings = jobs.get ('settings', {})
+            jobs = jobs['jobs']
+        if not isinstance (jobs, list) or not all (isinstance (job, dict) for job in jobs):
+            raise ValueError ('the jobs in a job file have to be a list of dicts')
+    except:
+        error = traceback.format_exc().splitlines()[-1]
+        palette_print (f'batch file {path} could not be read: {error}')
+        write_batch_report ({'file': path, 'error': error, 'seconds': 0.0, 'failures': 0, 'jobs': []})
+        return []
+    return run_batch (jobs, settings)
+
+# run each job and carry on past any that fail; the palette gets a line per job and a json report goes in the report folder
+# jobs can open other documents so whichever was active before is made active again at the end
+def run_batch (jobs, settings = {}):
+    batch_start_time = time.perf_counter()
+    results = []
+    active_document = app.activeDocument
+
+    for (n, job) in enumerate (jobs):
+        job_start_time = time.perf_counter()
+        result = {'job': n, 'document': job.get ('document', ''), 'sketch': job.get ('sketch', '')}
+
+        saved = {name: globals()[name] for name in batch_settings}
+        try:
+            job_settings = dict (settings)
+            job_settings.update (job.get ('settings', {}))
+            if 'tool_diameter' in job:
+                job_settings['tool_diameter'] = job['tool_diameter']
+            apply_settings (job_settings)
+
+            (input_sketch, faces) = find_job (job)
+            job_profile = gouge (input_sketch, faces)
+            result['status'] = 'ok'
+            result['curves'] = job_profile.counters['curves']
+            result['features'] = job_profile.counters['features']
 
-                    health_state = solid_loft_feature.healthState
+        except:
+            result['status'] = 'failed'
+            result['error'] = traceback.format_exc().splitlines()[-1]
+            debug_print (traceback.format_exc())
 
-                    if health_state == adsk.fusion.FeatureHealthStates.HealthyFeatureHealthState:
-                        debug_print (f'toolpath gouge {i} successful')
-                    elif health_state == adsk.fusion.FeatureHealthStates.WarningFeatureHealthState:
-                        warning = solid_loft_feature.errorOrWarningMessage
-                        debug_print (f'warning: {warning}')
-                    elif health_state == adsk.fusion.FeatureHealthStates.ErrorFeatureHealthState:
-                        error = solid_loft_feature.errorOrWarningMessage
-                        debug_print (f'error: {error}')
-                
-                # clean up a little
-                tmp_sketch.deleteMe()
+        finally:
+            apply_settings (saved)
 
-                start_sketch.isVisible = False
-                mid_sketch.isVisible = False
-                end_sketch.isVisible = False
+        result['seconds'] = time.perf_counter() - job_start_time
+        results.append (result)
 
-                i = i + 1
+        palette_print (f'job {n} {result["document"]} {result["sketch"]}: {result["status"]} in {result["seconds"]:.2f} sec'
+                       + (f' ({result["error"]})' if result['status'] == 'failed' else ''))
 
-            # clean up a little more
-            input_sketch.isVisible = False
-            rail_sketch.isVisible = False
+        # show progress as it goes since a batch can run for hours
+        flush_palette()
 
+    report = {}
+    if active_document and active_document.isValid and app.activeDocument != active_document:
+        try:
+            active_document.activate()
         except:
-            ui.messageBox('Failed:\n{}'.format(traceback.format_exc()))	
-
+            report['error'] = f'could not make {active_document.name} active again: {traceback.format_exc().splitlines()[-1]}'
+            palette_print (report['error'])
+
+    failures = sum (1 for result in results if result['status'] == 'failed')
+    seconds = time.perf_counter() - batch_start_time
+    palette_print (f'batch of {len(results)} jobs done in {seconds:.2f} sec with {failures} failures')
+
+    report.update ({'seconds': seconds, 'failures': failures, 'jobs': results})
+    write_batch_report (report)
+
+    return results
+
+def write_batch_report (report):
+    report_path = os.path.join (report_folder, f'gouge batch {time.strftime ("%Y%m%d-%H%M%S")}.json')
+    with open (report_path, 'w') as f:
+        json.dump (report, f, indent = 2)
+    palette_print (f'batch report written to {report_path}')
+
+def apply_settings (settings):
+    for (name, value) in settings.items():
+        if name not in batch_settings:
+            raise ValueError (f'unknown setting {name}')
+        globals()[name] = value
+
+# find the sketch and the faces for a job in its document, which becomes the active one
+def find_job (job):
+    document = app.activeDocument
+    if job.get ('document'):
+        document = find_document (job['document'])
+        document.activate()
+    if document is None:
+        raise ValueError (f'no document is open for {job.get ("sketch")}')
+    design = adsk.fusion.Design.cast (document.products.itemByProductType ('DesignProductType'))
+
+    input_sketch = None
+    entities = []
+    for component in design.allComponents:
+        input_sketch = input_sketch or component.sketches.itemByName (job['sketch'])
+        for name in job.get ('bodies', []):
+            body = component.bRepBodies.itemByName (name) or component.meshBodies.itemByName (name)
+            if body:
+                entities.append (body)
+    for token in job.get ('faces', []):
+        entities += design.findEntityByToken (token)
+
+    if input_sketch is None:
+        raise ValueError (f'no sketch named {job["sketch"]} in {document.name}')
+    if not entities:
+        raise ValueError (f'none of the bodies or faces for {job["sketch"]} are in {document.name}')
+    return (input_sketch, target_faces (entities))
+
+# open documents are named with their version on the end so either name works
+def find_document (name):
+    for document in app.documents:
+        if document.name == name or document.name.rsplit (' v', 1)[0] == name:
+            return document
+    raise ValueError (f'no open document named {name}')
+
+# draw the rails and tool tubes for the current inputs
+# the sampling is the only slow part so it's only redone when the sketch, faces or tolerance change;
+# the rest is plain math and is kept for the last few tool settings so spinning the diameter back and forth is instant
+def draw_preview (input_sketch, faces):
+    global preview_time
+    global preview_timer
+    global preview_graphics
+    sample_key = (input_sketch.entityToken, tuple (sorted (face.entityToken for face in faces)), sampling_tolerance)
+    if sample_key not in preview_samples:
+        preview_samples.clear()
+        preview_geometry.clear()
+        sampler = curve_sampler (surface_set (faces))
+        tolerance = math.radians (sampling_tolerance)
+        (paths, sources) = curve_paths (input_sketch.sketchCurves)
+        preview_samples[sample_key] = ([sampler.sample_path (path, tolerance) for path in paths], [tool_values (source) for source in sources])
+    (samples, values) = preview_samples[sample_key]
+
+    # the curves' own tool settings only get read with the samples; the defaults and table can change on every tick
+    # so the tools are resolved again whenever new geometry is built
+    geometry_key = (tool_diameter, taper_name, station_count, profile_samples, tool_table_file)
+    if geometry_key in preview_geometry:
+        preview_geometry.move_to_end (geometry_key)
+    elif preview_geometry and time.perf_counter() - preview_time < preview_interval:
+        # too soon after the last rebuild, so show the last geometry and come back for this tick's once the spinner settles
+        geometry_key = next (reversed (preview_geometry))
+        if preview_timer is None or not preview_timer.is_alive():
+            preview_timer = threading.Timer (preview_interval, app.fireCustomEvent, [preview_event_id])
+            preview_timer.start()
+    else:
+        # a tool table or tool setting that's wrong while it's being typed just means no preview; running the command reports it
+        try:
+            table = load_tool_table (tool_table_file)
+            tools = [resolve_tool (path_values, table, f'toolpath {k}') for (k, path_values) in enumerate (values)]
+        except (OSError, ValueError) as error:
+            debug_print (f'no preview: {error}')
+            clear_preview()
+            return
+        preview_geometry[geometry_key] = preview_mesh (samples, tools)
+        if len(preview_geometry) > preview_cache_size:
+            preview_geometry.popitem (last = False)
+        preview_time = time.perf_counter()
+    (line_coordinates, line_indices, mesh_coordinates, mesh_normals, mesh_indices) = preview_geometry[geometry_key]
+
+    # everything goes into one lines and one mesh entity since each custom graphics call is a round trip
+    # and the last preview's group is replaced rather than piling up a new one on every tick
+    clear_preview (cancel_timer = False)
+    graphics = app.activeProduct.rootComponent.customGraphicsGroups.add()
+    preview_graphics = graphics
+    if line_indices:
+        graphics.addLines (adsk.fusion.CustomGraphicsCoordinates.create (line_coordinates), line_indices, False)
+    if mesh_indices:
+        graphics.addMesh (adsk.fusion.CustomGraphicsCoordinates.create (mesh_coordinates), mesh_indices, mesh_normals, mesh_indices)
+
+# take the preview graphics off the screen and, unless a preview is drawing, stop any redraw that's waiting
+def clear_preview (cancel_timer = True):
+    global preview_graphics
+    if cancel_timer and preview_timer:
+        preview_timer.cancel()
+    if preview_graphics and preview_graphics.isValid:
+        preview_graphics.deleteMe()
+    preview_graphics = None
+
+# rails as line segments and tool tubes as one triangle mesh; tubes get coarser as the curve count goes up to stay in the triangle budget
+def preview_mesh (samples, tools):
+    rings = preview_rings
+    segments = preview_segments
+    count = max (len(samples), 1)
+    while 2 * (rings - 1) * segments * count > preview_triangle_budget and (segments > 4 or rings > 4):
+        if segments > 4:
+            segments -= 2
+        else:
+            rings -= 2
+
+    line_coordinates = []
+    line_indices = []
+    mesh_coordinates = []
+    mesh_normals = []
+    mesh_indices = []
+    for ((points, normals), tool) in zip (samples, tools):
+        if not gouge_geometry.has_length (points):
+            continue
+        radius = tool.diameter * 0.5
+        rail = gouge_geometry.compute_rail (points, normals, radius * tool.depth_scale, tool.taper)
+
+        first = len(line_coordinates) // 3
+        line_coordinates += gouge_geometry.rail_polyline (rail, rings)
+        for j in range(rings - 1):
+            line_indices += [first + j, first + j + 1]
+
+        (coordinates, vertex_normals, indices) = gouge_geometry.tube_mesh (rail, radius, rings, segments, len(mesh_coordinates) // 3)
+        mesh_coordinates += coordinates
+        mesh_normals += vertex_normals
+        mesh_indices += indices
+
+    return (line_coordinates, line_indices, mesh_coordinates, mesh_normals, mesh_indices)
+
+# copy the values of the command inputs into the globals and return the selected sketch and faces
+def read_inputs (command_inputs):
+    global debug
+    global gouge_surface
+    global tool_diameter
+    global cut_mode
+    global union_chunk_size
+    global merge_overlaps
+    global recover_failures
+    global defer_compute
+    global taper_name
+    global station_count
+    global profile_samples
+    global tool_table_file
+    global sampling_tolerance
+    global section_tolerance
+    global profile
+    global incremental
+    global worker_count
+    global engine
+    global export_format
+    global export_tolerance
+    global cam_setup
+    global clean_up
+    global mesh_edge_fraction
+
+    input_sketch = None
+    faces = []
+
+    for input in command_inputs:
+        if (input.id == 'sketch_select'):
+            input_sketch = input.selection(0).entity if input.selectionCount > 0 else None
+        elif (input.id == 'face_select'):
+            faces = target_faces ([input.selection(k).entity for k in range(input.selectionCount)])
+        elif (input.id == 'tool_diameter'):
+            tool_diameter = input.value    
+        elif (input.id == 'gouge_surface'):
+            gouge_surface = input.value           
+        elif (input.id == 'taper_profile'):
+            taper_name = input.selectedItem.name
+        elif (input.id == 'profile_samples'):
+            profile_samples = input.value
+        elif (input.id == 'tool_table_file'):
+            tool_table_file = input.value
+        elif (input.id == 'station_count'):
+            station_count = input.value
+        elif (input.id == 'sampling_tolerance'):
+            sampling_tolerance = input.value
+        elif (input.id == 'section_tolerance'):
+            section_tolerance = input.value
+        elif (input.id == 'engine'):
+            engine = input.selectedItem.name
+        elif (input.id == 'mesh_edge_fraction'):
+            mesh_edge_fraction = input.value
+        elif (input.id == 'cut_mode'):
+            cut_mode = input.selectedItem.name
+        elif (input.id == 'union_chunk_size'):
+            union_chunk_size = input.value
+        elif (input.id == 'merge_overlaps'):
+            merge_overlaps = input.value
+        elif (input.id == 'recover_failures'):
+            recover_failures = input.value
+        elif (input.id == 'defer_compute'):
+            defer_compute = input.value
+        elif (input.id == 'worker_count'):
+            worker_count = input.value
+        elif (input.id == 'incremental'):
+            incremental = input.value
+        elif (input.id == 'export_format'):
+            export_format = input.selectedItem.name
+        elif (input.id == 'export_tolerance'):
+            export_tolerance = input.value
+        elif (input.id == 'cam_setup'):
+            cam_setup = input.value
+        elif (input.id == 'clean_up'):
+            clean_up = input.value
+        elif (input.id == 'profile'):
+            profile = input.value
+        elif (input.id == 'debug'):
+            debug = input.value           
+        else: 
+            debug_print (f'OOOPS --- too much input')
+
+    return (input_sketch, faces)
+
+# build the lofts and cuts for all the gouges on one body
+# returns the rail sketch and section bodies that are left over afterwards,
+# for each gouge index the toolpath curve and features that make up its own cut
+# and for each gouge index the joins and combined cuts it shares with other gouges
+def gouge_body (body, indices, rails, circles):
+    component = body.parentComponent
+    design = component.parentDesign
+
+    # rail sketch should exist in the same coordinate system as the parent component of the body
+    # incremental runs keep adding to the body's rail sketch instead of making another one each time
+    with run_profile.phase ('rail sketch'):
+        rail_sketch = component.sketches.itemByName (f'rail sketch {body.name}') if incremental else None
+        if rail_sketch is None:
+            rail_sketch = component.sketches.add (component.xYConstructionPlane)
+            rail_sketch.name = f'rail sketch {body.name}'
+
+        # add the toolpath curves to the rail sketch
+        toolpaths = [rail_sketch.sketchCurves.sketchFixedSplines.addByNurbsCurve (nurbs_curve (rail)) for rail in rails]
+        run_profile.count ('sketches')
+    debug_print (f'rail sketch has {rail_sketch.sketchCurves.count} curve(s)')
+
+    # all the section circles go into the design at once as planar disks that the lofts use as sections
+    with run_profile.phase ('section disks'):
+        (sections, section_bodies) = add_section_disks (component, circles)
+        run_profile.count ('features')
+
+    # gouges that overlap are found up front so they can be cut together
+    with run_profile.phase ('clusters'):
+        if merge_overlaps:
+            # with mixed tools the biggest one decides how close counts as overlapping
+            reach = max (2.0 * gouge_circles[0][2] for gouge_circles in circles)
+            clusters = gouge_geometry.rail_clusters (rails, reach)
+        else:
+            clusters = [[k] for k in range(len(rails))]
+        merged = [cluster for cluster in clusters if len(cluster) > 1]
+    run_profile.count ('clusters', len(merged))
+    palette_print (f'{len(rails)} gouges on {body.name} make {len(clusters)} clusters, {len(merged)} of them with overlapping gouges')
+
+    # in combined mode each loft makes a tool body and they all get cut from the body at the end
+    # otherwise only the gouges in a cluster make tool bodies and the rest cut as they go
+    combined_cut = cut_mode == cut_modes[1]
+    tool_gouges = set (k for cluster in (clusters if combined_cut else merged) for k in cluster)
+
+    tool_features = {}
+    created = {index: [toolpath] for (index, toolpath) in zip (indices, toolpaths)}
+    shared = {index: [] for index in indices}
+
+    leftovers = [rail_sketch] + section_bodies
+
+    i = 0
+    for r in toolpaths:
+
+        # a loft that gouges the surface or makes a tool body to be cut later
+        combined = i in tool_gouges
+        if combined:
+            loft_operation = adsk.fusion.FeatureOperations.NewBodyFeatureOperation
+        else:
+            loft_operation = adsk.fusion.FeatureOperations.CutFeatureOperation
+
+        if gouge_surface:
+            with run_profile.phase ('loft' if combined else 'loft cut', indices[i]):
+                (solid_loft_feature, extras) = build_gouge (component, body, loft_operation, rail_sketch, r, sections[i], rails[i], circles[i], indices[i])
+            leftovers += extras
+
+            # a gouge nothing worked for is left out of the cache so the next incremental run tries it again
+            if solid_loft_feature is None:
+                del created[indices[i]]
+            else:
+                created[indices[i]].append (solid_loft_feature)
+                if combined:
+                    tool_features[i] = solid_loft_feature
+
+        i = i + 1
+
+    # the cuts need the tool bodies so compute everything built so far in one go and go back to deferring after
+    if defer_compute and tool_features:
+        with run_profile.phase ('compute'):
+            design.isComputeDeferred = False
+
+    tool_bodies = {}
+    for (k, feature) in tool_features.items():
+        if feature.bodies.count > 0:
+            tool_body = feature.bodies.item(0)
+            tool_body.name = f'gouge tool {indices[k]}'
+            tool_bodies[k] = tool_body
+
+    # tool bodies in the same cluster are joined first so overlapping gouges never get cut one after another
+    groups = [[k for k in cluster if k in tool_bodies] for cluster in clusters]
+    groups = [group for group in groups if group]
+    if combined_cut and not merge_overlaps:
+        ordered = [k for group in groups for k in group]
+        groups = [ordered[k:k + union_chunk_size] for k in range(0, len(ordered), union_chunk_size)]
+
+    # one boolean for all the gouges in combined mode, otherwise one for each cluster
+    # a cut that fails is tried again in smaller pieces, a cut of many clusters one cluster at a time and a cluster one tool body at a time,
+    # and a tool body that still won't cut is deleted with its loft and counted as a failed gouge
+    cuts = [groups] if combined_cut else [[group] for group in groups]
+    for cut_groups in cuts:
+        cut_groups = [[k for k in group if k in tool_bodies] for group in cut_groups]
+        cut_groups = [group for group in cut_groups if group]
+        if not cut_groups:
+            continue
+        with run_profile.phase ('combine cut'):
+            (combine_feature, joins) = combine_cut (component, body, [[tool_bodies[k] for k in group] for group in cut_groups])
+
+        if failed (combine_feature) and recover_failures:
+            # deleting the cut and the joins brings back all the tool bodies they used up
+            delete_feature (combine_feature)
+            for join in joins:
+                delete_feature (join)
+            for group in cut_groups:
+                for k in group:
+                    tool_bodies[k] = tool_features[k].bodies.item(0)
+
+            if len(cut_groups) > 1:
+                palette_print (f'combined cut of {len(cut_groups)} clusters failed, cutting them one at a time')
+                cuts += [[group] for group in cut_groups]
+            elif len(cut_groups[0]) > 1:
+                palette_print (f'cut of {len(cut_groups[0])} overlapping gouges failed, cutting them one at a time')
+                cuts += [[[k]] for k in cut_groups[0]]
+            else:
+                k = cut_groups[0][0]
+                palette_print (f'toolpath gouge {indices[k]}: cut failed, left out')
+                delete_feature (tool_features[k])
+                del tool_bodies[k]
+                del created[indices[k]]
+                run_profile.count ('failed gouges')
+            continue
+
+        # the joins that worked used up the rest of their group so only the first body of the group is left to cut
+        for (group, join) in zip (cut_groups, joins):
+            if join is not None:
+                for k in group[1:]:
+                    tool_bodies.pop (k, None)
+                for k in group:
+                    shared[indices[k]].append (join)
+
+        report_health (combine_feature, f'combined cut of {sum (len(group) for group in cut_groups)} tool bodies')
+        if failed (combine_feature):
+            run_profile.count ('failed cuts')
+        if combine_feature is None:
+            continue
+        for group in cut_groups:
+            for k in group:
+                shared[indices[k]].append (combine_feature)
+
+    if defer_compute:
+        design.isComputeDeferred = True
+
+    return (leftovers, created, shared)
+
+# add the loft for one gouge and if it fails delete it and work down the fallbacks until one builds
+# returns the feature, or None if nothing worked, and any extra section bodies the fallbacks made
+def build_gouge (component, body, operation, rail_sketch, toolpath, sections, rail, circles, index):
+    feature = add_loft (component, body, operation, toolpath, sections)
+    run_profile.count ('features')
+    if not failed (feature):
+        report_health (feature, f'toolpath gouge {index}')
+        return (feature, [])
+
+    extras = []
+    if recover_failures:
+        for name in fallbacks:
+            delete_feature (feature)
+            with run_profile.phase ('fallback', index):
+                (feature, fallback_extras) = fallback_gouge (name, component, body, operation, rail_sketch, toolpath, sections, rail, circles)
+            extras += fallback_extras
+            run_profile.count ('features')
+            if not failed (feature):
+                palette_print (f'toolpath gouge {index}: loft failed, {name} worked')
+                run_profile.count (f'fallback {name}')
+                return (feature, extras)
+
+    # leave nothing broken in the timeline
+    palette_print (f'toolpath gouge {index}: failed{" and every fallback failed too" if recover_failures else ""}, left out')
+    delete_feature (feature)
+    run_profile.count ('failed gouges')
+    return (None, extras)
+
+# build one gouge a different way; returns the feature, which is None if this way doesn't apply, and any section bodies it made
+def fallback_gouge (name, component, body, operation, rail_sketch, toolpath, sections, rail, circles):
+    stations = len(circles)
+    radius = circles[0][2]
+
+    if name == 'more sections':
+        # twice as many sections evenly spaced along the rail
+        count = 2 * stations - 1
+        (more_sections, bodies) = add_section_disks (component, [gouge_geometry.section_circles (rail, [j / (count - 1) for j in range(count)], radius)])
+        return (add_loft (component, body, operation, toolpath, more_sections[0]), bodies)
+
+    if name == 'shortened rail':
+        # keep the ends of the rail away from where they run tangent into the surface
+        short_rail = gouge_geometry.trim_rail (rail, rail_trim)
+        short_toolpath = rail_sketch.sketchCurves.sketchFixedSplines.addByNurbsCurve (nurbs_curve (short_rail))
+        (short_sections, bodies) = add_section_disks (component, [gouge_geometry.section_circles (short_rail, [j / (stations - 1) for j in range(stations)], radius)])
+        return (add_loft (component, body, operation, short_toolpath, short_sections[0]), bodies)
+
+    if name == 'sweep':
+        # the first section swept along the rail
+        sweep_features = component.features.sweepFeatures
+        sweep_input = sweep_features.createInput (sections[0], component.features.createPath (toolpath, False), operation)
+        sweep_input.orientation = adsk.fusion.SweepOrientationTypes.PerpendicularOrientationType
+        if operation == adsk.fusion.FeatureOperations.CutFeatureOperation:
+            sweep_input.participantBodies = [body]
+        return (add_feature (sweep_features, sweep_input), [])
+
+    if name == 'point ends':
+        # the gouge closes down to the ends of the rail instead of to a full circle
+        if len(sections) < 3:
+            return (None, [])
+        points = [toolpath.startSketchPoint] + sections[1:-1] + [toolpath.endSketchPoint]
+        return (add_loft (component, body, operation, toolpath, points), [])
+
+    return (None, [])
+
+def add_loft (component, body, operation, toolpath, sections):
+    solid_loft_features = component.features.loftFeatures
+    solid_loft_input = solid_loft_features.createInput(operation)
+    solid_loft_input.isSolid = True
+
+    solid_loft_sections = solid_loft_input.loftSections
+    for section in sections:
+        solid_loft_sections.add(section)
+
+    solid_loft_input.centerLineOrRails.addRail (toolpath)
+
+    if operation == adsk.fusion.FeatureOperations.CutFeatureOperation:
+        participant_bodies = []
+        participant_bodies.append (body)
+        solid_loft_input.participantBodies = participant_bodies
+
+    return add_feature (solid_loft_features, solid_loft_input)
+
+# fusion throws when a feature can't be built at all, which is the same as a failed feature here
+def add_feature (features, feature_input):
+    try:
+        return features.add (feature_input)
+    except RuntimeError:
+        debug_print (f'feature failed: {traceback.format_exc().splitlines()[-1]}')
+        return None
+
+def failed (feature):
+    return feature is None or feature.healthState in (adsk.fusion.FeatureHealthStates.WarningFeatureHealthState, adsk.fusion.FeatureHealthStates.ErrorFeatureHealthState)
+
+def delete_feature (feature):
+    if feature is not None and feature.isValid:
+        feature.deleteMe()
+
+# press all the gouges on one body into a tessellation of it, or into the mesh itself for a mesh body,
+# and save the result as a new mesh body in place of the original which gets hidden
+# the whole body is tessellated since all of it is hidden, but only the selected faces are tessellated finely
+def gouge_mesh_body (surface, body_index, rails, radii):
+    body = surface.bodies[body_index]
+    component = body.parentComponent
+    max_edge = mesh_edge_fraction * 2.0 * min (radii)
+
+    with run_profile.phase ('tessellate'):
+        if isinstance (surface, mesh_set):
+            meshes = [body.mesh]
+        else:
+            selected = [face for (face, face_body) in zip (surface.faces, surface.face_bodies) if face_body == body_index]
+            meshes = []
+            for face in body.faces:
+                calculator = face.meshManager.createMeshCalculator()
+                calculator.setQuality (adsk.fusion.TriangleMeshQualityOptions.NormalQualityTriangleMesh)
+                if face in selected:
+                    calculator.maxSideLength = max_edge
+                meshes.append (calculator.calculate())
+
+        # every face's mesh numbers its vertices from zero so they get shifted as the meshes are put together
+        # a mesh body can have quads and polygons as well as triangles
+        points = []
+        normals = []
+        triangles = []
+        for mesh in meshes:
+            if isinstance (surface, mesh_set):
+                (mesh_points, mesh_normals, mesh_triangles) = gouge_geometry.unflatten_mesh (mesh.nodeCoordinatesAsDouble, mesh.normalVectorsAsDouble, mesh.triangleNodeIndices)
+                mesh_triangles += gouge_geometry.polygon_triangles (mesh.quadNodeIndices, mesh.polygonNodeIndices, mesh.nodeCountPerPolygon)
+            else:
+                (mesh_points, mesh_normals, mesh_triangles) = gouge_geometry.unflatten_mesh (mesh.nodeCoordinatesAsDouble, mesh.normalVectorsAsDouble, mesh.nodeIndices)
+            first = len(points)
+            points += mesh_points
+            normals += mesh_normals
+            triangles += [(a + first, b + first, c + first) for (a, b, c) in mesh_triangles]
+    debug_print (f'{body.name} tessellated into {len(points)} vertices and {len(triangles)} triangles')
+
+    with run_profile.phase ('mesh gouge'):
+        (points, normals, triangles, moved, capped) = gouge_geometry.gouge_mesh (points, normals, triangles, rails, radii, max_edge, mesh_max_vertices)
+    if capped:
+        palette_print (f'{body.name}: the mesh reached {mesh_max_vertices} vertices so it is coarser than {max_edge:.4f} cm in places')
+    debug_print (f'{moved} of {len(points)} vertices gouged')
+
+    with run_profile.phase ('mesh body'):
+        (coordinates, normal_vectors, indices) = gouge_geometry.flatten_mesh (points, normals, triangles)
+
+        parametric = component.parentDesign.designType == adsk.fusion.DesignTypes.ParametricDesignType
+        if parametric:
+            base_feature = component.features.baseFeatures.add()
+            base_feature.name = 'gouge mesh'
+            base_feature.startEdit()
+
+        mesh_body = component.meshBodies.addByTriangleMeshData (coordinates, indices, normal_vectors, indices).item(0)
+        mesh_body.name = f'{body.name} gouged'
+
+        if parametric:
+            base_feature.finishEdit()
+        run_profile.count ('features')
+
+    body.isVisible = False
+    return mesh_body
+
+# write all the rails to a file in the export format, with the radius of each rail's tool for the 3 axis g-code
+def export_toolpaths (rails, radii, name):
+    toolpaths = [gouge_geometry.toolpath_points (rail, export_tolerance) for rail in rails]
+    path = os.path.join (export_folder, f'gouge toolpaths {name} {time.strftime ("%Y%m%d-%H%M%S")}')
+    point_count = sum (len(toolpath) for toolpath in toolpaths)
+
+    if export_format == 'CSV':
+        path += '.csv'
+        gouge_export.write_csv (path, toolpaths)
+    elif export_format == 'JSON':
+        path += '.json'
+        gouge_export.write_json (path, toolpaths)
+    elif export_format == 'G-code':
+        path += '.nc'
+        (moves, point_count) = gouge_export.write_gcode (path, toolpaths, radii, feed_rate, plunge_rate, clearance, merge_tolerance, name)
+        debug_print (f'{point_count} points merged into {moves} moves')
+
+    palette_print (f'{len(toolpaths)} toolpaths with {point_count} points written to {path}')
+
+# a milling setup for the body with a trace operation for each tool diameter that follows its rails with a ball end mill that size
+# trace drives the tool tip, so the sketch gets the rails moved to where the tip of the vertical ball end mill has to be
+# for the ball to touch the bottom of the gouge; the sketch is its own so the setup doesn't depend on any of the gouge modeling
+def cam_toolpaths (body, tool_rails):
+    component = body.parentComponent
+    document = component.parentDesign.parentDocument
+
+    # the manufacture product only exists once the workspace has been opened
+    cam = adsk.cam.CAM.cast (document.products.itemByProductType ('CAMProductType'))
+    if cam is None:
+        workspace = ui.activeWorkspace
+        ui.workspaces.itemById ('CAMEnvironment').activate()
+        workspace.activate()
+        cam = adsk.cam.CAM.cast (document.products.itemByProductType ('CAMProductType'))
+
+    toolpath_sketch = component.sketches.add (component.xYConstructionPlane)
+    toolpath_sketch.name = f'toolpath sketch {body.name}'
+    toolpath_sketch.isVisible = False
+
+    setup_input = cam.setups.createInput (adsk.cam.OperationTypes.MillingOperation)
+    setup_input.models = [body]
+    setup_input.name = f'gouges {body.name}'
+    setup = cam.setups.add (setup_input)
+
+    for (diameter, rails) in tool_rails.items():
+        toolpath_curves = [toolpath_sketch.sketchCurves.sketchFixedSplines.addByNurbsCurve (nurbs_curve (gouge_geometry.tool_tip_rail (rail, diameter * 0.5)))
+                           for rail in rails]
+
+        operation_input = setup.operations.createInput ('trace')
+        operation_input.displayName = f'gouge trace {10.0 * diameter:.2f} mm'
+        try:
+            operation_input.tool = adsk.cam.Tool.createFromJson (json.dumps (ball_end_mill (diameter)))
+        except:
+            palette_print (f'could not make a {10.0 * diameter:.2f} mm ball end mill for {setup.name}, pick one for {operation_input.displayName}')
+        operation = setup.operations.add (operation_input)
+
+        # every rail is its own chain since they're all open curves
+        curves_value = operation.parameters.itemByName ('curves').value
+        selections = curves_value.getCurveSelections()
+        for curve in toolpath_curves:
+            chain = selections.createNewChainSelection()
+            chain.inputGeometry = [curve]
+        curves_value.applyCurveSelections (selections)
+
+        cam.generateToolpath (operation)
+        palette_print (f'{setup.name}: {operation.name} along {len(toolpath_curves)} rails')
+
+    return setup
+
+# tool library entry for a ball end mill of the given diameter in cm
+def ball_end_mill (diameter):
+    return {
+        'type': 'ball end mill',
+        'unit': 'millimeters',
+        'description': f'gouge {10.0 * diameter:.2f} mm ball',
+        'geometry': {
+            'DC': 10.0 * diameter,
+            'SFDM': 10.0 * diameter,
+            'LCF': 40.0 * diameter,
+            'LB': 60.0 * diameter,
+            'OAL': 80.0 * diameter,
+            'NOF': 2,
+        },
+    }
+
+# per curve results from earlier runs, kept in attributes on the input sketch so a re-run only rebuilds what changed
+# each entry is keyed by a hash of the curve's nurbs data and the tool settings and holds the rail, the section circles,
+# the body it was cut from, entity tokens for what was created just for it and for the joins and cuts it shares with other gouges
+# tokens are only ever resolved with findEntityByToken since fusion doesn't promise the same string for the same entity
+class gouge_cache:
+    group = 'gouge_surface'
+
+    def __init__(self, sketch, design):
+        self.attributes = sketch.attributes
+        self.design = design
+        self.entries = {}
+        for attribute in self.attributes.itemsByGroup (self.group):
+            self.entries[attribute.name] = json.loads (attribute.value)
+            self.entries[attribute.name].setdefault ('shared', [])
+
+        # the gouges holding each shared feature; it's only deleted once none of them are left
+        self.users = collections.defaultdict (set)
+        for (key, entry) in self.entries.items():
+            for token in entry['shared']:
+                self.users[token].add (key)
+
+    # a cached gouge is still in the design if everything created for it and everything it shares can be found
+    def is_built (self, key):
+        entry = self.entries.get (key)
+        return entry is not None and len(entry['created']) > 0 and all (self.entity (token) for token in entry['created'] + entry['shared'])
+
+    def entity (self, token):
+        entities = [entity for entity in self.design.findEntityByToken (token) if entity.isValid]
+        return entities[0] if entities else None
+
+    def rail (self, key):
+        (control_points, knots, degree, fractions, normals) = self.entries[key]['rail']
+        return gouge_geometry.rail_curve ([tuple (p) for p in control_points], knots, degree, fractions, [tuple (n) for n in normals])
+
+    def circles (self, key):
+        return [(tuple (center), tuple (axis), radius) for (center, axis, radius) in self.entries[key]['circles']]
+
+    def body (self, key):
+        return self.entity (self.entries[key]['body'])
+
+    # delete everything created for gouges that aren't wanted any more and forget them,
+    # then take down whatever is left of gouges that are only partly there so they get rebuilt from their cached rails
+    def remove_stale (self, keys):
+        stale = [key for key in self.entries if key not in keys]
+        for key in stale:
+            self.release (key)
+            self.forget (key)
+        for key in list (self.entries):
+            if self.entries[key]['created'] and not self.is_built (key):
+                self.release (key)
+        return len(stale)
+
+    # delete what was built for a gouge but keep its rail and circles
+    # a shared join or cut has the gouge's tool body in it, so the other gouges holding it are released and rebuilt too
+    def release (self, key):
+        entry = self.entries[key]
+        (created, shared) = (entry['created'], entry['shared'])
+        if not created and not shared:
+            return
+        self.save (key, dict (entry, created = [], shared = []))
+
+        others = set()
+        for token in shared:
+            users = self.users.pop (token, set())
+            users.discard (key)
+            others |= users
+
+        # shared features come after the lofts in the timeline so everything goes latest first
+        sketches = []
+        for token in list (reversed (shared)) + list (reversed (created)):
+            entity = self.entity (token)
+            if entity is None:
+                continue
+            if entity.objectType == adsk.fusion.SketchFixedSpline.classType():
+                sketches.append (entity.parentSketch)
+            entity.deleteMe()
+
+        # a rail sketch with nothing left in it goes too
+        for sketch in sketches:
+            if sketch.isValid and sketch.sketchCurves.count == 0:
+                sketch.deleteMe()
+
+        for other in others:
+            self.release (other)
+
+    def store (self, key, rail, circles, body_token, created, shared):
+        entry = {
+            'rail': [rail.control_points, rail.knots, rail.degree, rail.fractions, rail.normals],
+            'circles': circles,
+            'body': body_token,
+            'created': [entity.entityToken for entity in created],
+            'shared': [entity.entityToken for entity in shared],
+        }
+        self.save (key, entry)
+        for token in entry['shared']:
+            self.users[token].add (key)
+
+    # adding an attribute that's already there replaces its value
+    def save (self, key, entry):
+        self.entries[key] = entry
+        self.attributes.add (self.group, key, json.dumps (entry))
+
+    def forget (self, key):
+        attribute = self.attributes.itemByName (self.group, key)
+        if attribute:
+            attribute.deleteMe()
+        del self.entries[key]
+
+# hash of everything that decides what a path's gouge looks like; the faces are left out since cutting a gouge changes them
+def path_key (path, settings):
+    data = [settings]
+    for (curve, flipped) in path:
+        (status, points, degree, knots, is_rational, weights, is_periodic) = curve.getData()
+        data.append ([[(round (p.x, 9), round (p.y, 9), round (p.z, 9)) for p in points], degree, list (knots), list (weights), flipped])
+    return hashlib.sha1 (json.dumps (data).encode()).hexdigest()
+
+# turn the selected faces and bodies into a list of faces; mesh bodies are passed along as they are
+def target_faces (entities):
+    faces = []
+    for entity in entities:
+        if entity.objectType == adsk.fusion.BRepBody.classType():
+            faces += [face for face in entity.faces]
+        else:
+            faces.append (entity)
+    return faces
+
+# the faces the gouges run over with a bounding box tree to find which face a point is on
+# it has the same getNormalsAtPoints as a face evaluator so the sampler doesn't need to know there's more than one face
+class face_set:
+    def __init__(self, faces):
+        self.faces = faces
+        self.evaluators = [face.evaluator for face in faces]
+        self.api_calls = len(faces)
+
+        # the bodies the faces belong to and which body each face is on
+        self.bodies = []
+        self.face_bodies = []
+        for face in faces:
+            body = face.body
+            if body not in self.bodies:
+                self.bodies.append (body)
+            self.face_bodies.append (self.bodies.index (body))
+
+        boxes = []
+        if len(faces) > 1:
+            for face in faces:
+                box = face.boundingBox
+                boxes.append (((box.minPoint.x, box.minPoint.y, box.minPoint.z), (box.maxPoint.x, box.maxPoint.y, box.maxPoint.z)))
+            self.api_calls += len(faces)
+        self.tree = gouge_geometry.box_tree (boxes)
+
+        # how many samples landed on each face since it was last cleared
+        self.hits = collections.Counter()
+
+    # the face each point is on; points inside more than one face's box go to the face whose surface is closest
+    # faces that share a surface extension also share the normal along it so picking either one is fine
+    def assign_faces (self, points):
+        if len(self.faces) == 1:
+            return [0] * len(points)
+
+        coordinates = [(p.x, p.y, p.z) for p in points]
+        assignment = [None] * len(points)
+        contested = {}
+        for (k, c) in enumerate (coordinates):
+            candidates = self.tree.query (c, face_tolerance)
+            if not candidates:
+                candidates = [self.tree.nearest (c)]
+            if len(candidates) == 1:
+                assignment[k] = candidates[0]
+            else:
+                for f in candidates:
+                    contested.setdefault (f, []).append (k)
+
+        # a face whose surface can't take the points just isn't in the running for them
+        closest = {}
+        for (f, indices) in contested.items():
+            evaluator = self.evaluators[f]
+            (status, parameters) = evaluator.getParametersAtPoints ([points[k] for k in indices])
+            self.api_calls += 1
+            if not status:
+                continue
+            (status, surface_points) = evaluator.getPointsAtParameters (parameters)
+            self.api_calls += 1
+            if not status or len(surface_points) != len(indices):
+                continue
+            for (k, q) in zip (indices, surface_points):
+                d = gouge_geometry.distance (coordinates[k], (q.x, q.y, q.z))
+                if k not in closest or d < closest[k][0]:
+                    closest[k] = (d, f)
+
+        for (k, (d, f)) in closest.items():
+            assignment[k] = f
+
+        # points none of their faces could place go to the face with the closest box
+        for (k, f) in enumerate (assignment):
+            if f is None:
+                assignment[k] = self.tree.nearest (coordinates[k])
+
+        return assignment
+
+    def getNormalsAtPoints (self, points):
+        assignment = self.assign_faces (points)
+
+        face_points = {}
+        for (k, f) in enumerate (assignment):
+            face_points.setdefault (f, []).append (k)
+
+        normals = [None] * len(points)
+        for (f, indices) in face_points.items():
+            (status, face_normals) = self.evaluators[f].getNormalsAtPoints ([points[k] for k in indices])
+            self.api_calls += 1
+            for (k, normal) in zip (indices, face_normals):
+                normals[k] = normal
+            self.hits[f] += len(indices)
+
+        return (True, normals)
+
+    # index of the body most of the samples since the hits were cleared landed on
+    def path_body (self):
+        if not self.hits:
+            return 0
+        body_hits = collections.Counter()
+        for (f, count) in self.hits.items():
+            body_hits[self.face_bodies[f]] += count
+        return body_hits.most_common (1)[0][0]
+
+    # index of a body from an earlier run, or None if it isn't one of the selected ones
+    def body_index (self, body):
+        return self.bodies.index (body) if body is not None and body in self.bodies else None
+
+# the selected mesh bodies or faces as something the sampler can get normals from
+def surface_set (entities):
+    meshes = [entity for entity in entities if entity.objectType == adsk.fusion.MeshBody.classType()]
+    if not meshes:
+        return face_set (entities)
+    if len(meshes) < len(entities):
+        raise ValueError ('select either faces and solid bodies or mesh bodies, not both')
+    return mesh_set (meshes)
+
+# mesh bodies the gouges run over, with the same interface as a face set
+# the normal at a point is the normal of the closest mesh vertex, found with a grid over all the vertices
+class mesh_set:
+    def __init__(self, meshes):
+        self.faces = meshes
+        self.bodies = meshes
+        self.face_bodies = list (range (len(meshes)))
+        self.api_calls = 0
+
+        self.points = []
+        self.normals = []
+        self.owners = []
+        for (k, mesh_body) in enumerate (meshes):
+            mesh = mesh_body.mesh
+            (points, normals, triangles) = gouge_geometry.unflatten_mesh (mesh.nodeCoordinatesAsDouble, mesh.normalVectorsAsDouble, [])
+            self.points += points
+            self.normals += normals
+            self.owners += [k] * len(points)
+            self.api_calls += 3
+
+        # cells about as big as the spacing between vertices, guessing the surface is about as big as its bounding box
+        low = tuple (min (p[a] for p in self.points) for a in range(3))
+        high = tuple (max (p[a] for p in self.points) for a in range(3))
+        area = max (sum (high[a] - low[a] for a in range(3)) ** 2 / 3.0, 1.0e-12)
+        self.grid = gouge_geometry.spatial_grid (max (2.0 * math.sqrt (area / max (len(self.points), 1)), 1.0e-6))
+        for (k, p) in enumerate (self.points):
+            self.grid.add (p, p, k)
+
+        self.hits = collections.Counter()
+
+    def nearest (self, point):
+        candidates = self.grid.items_near (point)
+        if not candidates:
+            candidates = range (len(self.points))
+        return min (candidates, key = lambda k: gouge_geometry.distance (self.points[k], point))
+
+    def getNormalsAtPoints (self, points):
+        normals = []
+        for p in points:
+            k = self.nearest ((p.x, p.y, p.z))
+            normals.append (vector3d (self.normals[k]))
+            self.hits[self.owners[k]] += 1
+        return (True, normals)
+
+    def path_body (self):
+        return self.hits.most_common (1)[0][0] if self.hits else 0
+
+# compute the rail and section circles for each job, in a process pool when there are enough of them
+# anything that goes wrong with the pool just means doing the work here instead
+# in this process the rail and sections are timed for each curve; the pool can only be timed as a whole
+def compute_gouges (jobs, workers, indices = None):
+    if workers > 1 and sum (len(job[0]) for job in jobs) >= parallel_samples:
+        executable = python_executable()
+        if executable:
+            try:
+                with run_profile.phase ('pool'):
+                    return pool_gouges (jobs, workers, executable)
+            except Exception:
+                debug_print (f'process pool failed, computing in this process:\n{traceback.format_exc()}')
+        else:
+            debug_print ('no python executable found for worker processes, computing in this process')
+
+    results = []
+    for (index, job) in zip (indices or range (len(jobs)), jobs):
+        with run_profile.phase ('rail', index):
+            rail = gouge_geometry.job_rail (job)
+        with run_profile.phase ('sections', index):
+            results.append ((rail, gouge_geometry.job_sections (job, rail)))
+    return results
+
+def pool_gouges (jobs, workers, executable):
+    python_file_folder = os.path.dirname(os.path.realpath(__file__))
+
+    # the executable is process wide so fusion gets its own back when the pool is done
+    previous_executable = multiprocessing.spawn.get_executable()
+    multiprocessing.set_executable (executable)
+
+    # workers import the geometry module by its own name since they don't know about the add-in's package
+    # the folder only goes on fusion's path for as long as the pool runs
+    added_path = python_file_folder not in sys.path
+    if added_path:
+        sys.path.insert (0, python_file_folder)
+
+    python_path = os.environ.get ('PYTHONPATH')
+    os.environ['PYTHONPATH'] = python_file_folder + (os.pathsep + python_path if python_path else '')
+    try:
+        worker_geometry = importlib.import_module ('gouge_geometry')
+        context = multiprocessing.get_context ('spawn')
+        with concurrent.futures.ProcessPoolExecutor (max_workers = workers, mp_context = context) as executor:
+            chunk_size = max (1, len(jobs) // (workers * 4))
+            return list (executor.map (worker_geometry.gouge_job, jobs, chunksize = chunk_size))
+    finally:
+        if python_path is None:
+            del os.environ['PYTHONPATH']
+        else:
+            os.environ['PYTHONPATH'] = python_path
+        if added_path and python_file_folder in sys.path:
+            sys.path.remove (python_file_folder)
+        multiprocessing.set_executable (previous_executable)
+
+# inside fusion sys.executable is fusion itself so look for the python interpreter that comes with it
+def python_executable ():
+    if os.path.basename (sys.executable).lower().startswith ('python'):
+        return sys.executable
+
+    folder = os.path.dirname (sys.executable)
+    candidates = [
+        os.path.join (folder, 'Python', 'python.exe'),
+        os.path.join (sys.prefix, 'python.exe'),
+        os.path.join (sys.prefix, 'bin', f'python{sys.version_info.major}.{sys.version_info.minor}'),
+        os.path.join (sys.prefix, 'bin', 'python3'),
+    ]
+    for candidate in candidates:
+        if os.path.isfile (candidate):
+            return candidate
+    return None
+
+# samples curves over the faces using the bulk evaluator calls and keeps count of the round trips to the api
+class curve_sampler:
+    def __init__(self, face_evaluator):
+        self.face_evaluator = face_evaluator
+        self.api_calls = 0
+
+    # returns the sampled points along the curve and the face normals at them
+    def sample (self, curve_evaluator, tolerance):
+        (status, start_p, end_p) = curve_evaluator.getParameterExtents()
+        self.api_calls += 1
+
+        def evaluate (parameters):
+            (status, points) = curve_evaluator.getPointsAtParameters (parameters)
+            (status, tangents) = curve_evaluator.getFirstDerivatives (parameters)
+            (status, normals) = self.face_evaluator.getNormalsAtPoints (points)
+            self.api_calls += 3
+            return ([(p.x, p.y, p.z) for p in points], [(v.x, v.y, v.z) for v in tangents], [(n.x, n.y, n.z) for n in normals])
+
+        (parameters, points, tangents, normals) = gouge_geometry.adaptive_samples (evaluate, start_p, end_p, tolerance, initial_samples)
+        return (points, normals)
+
+    # samples each curve of a chained path in order and joins them up, dropping the repeated point where they meet
+    def sample_path (self, path, tolerance):
+        path_points = []
+        path_normals = []
+        for (curve, flipped) in path:
+            (points, normals) = self.sample (curve.evaluator, tolerance)
+            if flipped:
+                points.reverse()
+                normals.reverse()
+            if path_points:
+                points = points[1:]
+                normals = normals[1:]
+            path_points += points
+            path_normals += normals
+        return (path_points, path_normals)
+
+# turn the sketch curves that aren't construction or reference geometry into nurbs and chain the connected ones into paths
+# each path is a list of (nurbs curve, flipped) in order from one end to the other
+# also returns the sketch curves that make up each path, in the same order
+def curve_paths (sketch_curves):
+    curves = []
+    sources = []
+    endpoints = []
+    for sketch_curve in sketch_curves:
+        # construction lines and projected or referenced geometry like a face outline are there to draw with, not to gouge
+        if sketch_curve.isConstruction or sketch_curve.isReference:
+            continue
+
+        geometry = sketch_curve.worldGeometry
+        if geometry.objectType == adsk.core.NurbsCurve3D.classType():
+            curve = geometry
+        else:
+            curve = geometry.asNurbsCurve
+
+        (status, start_point, end_point) = curve.evaluator.getEndPoints()
+        curves.append (curve)
+        sources.append (sketch_curve)
+        endpoints.append (((start_point.x, start_point.y, start_point.z), (end_point.x, end_point.y, end_point.z)))
+
+    chains = gouge_geometry.chain_curves (endpoints, chain_tolerance)
+    paths = [[(curves[index], flipped) for (index, flipped) in chain] for chain in chains]
+    return (paths, [[sources[index] for (index, flipped) in chain] for chain in chains])
+
+# turn '0, 0.5, 1, 0.5, 0' into a tuple of depth fractions
+def parse_samples (text):
+    return tuple (float (value) for value in text.replace (',', ' ').split())
+
+# the gouge attributes on the first curve of a path that has any, as a dict of strings
+def tool_values (sketch_curves):
+    for sketch_curve in sketch_curves:
+        attributes = sketch_curve.attributes.itemsByGroup (tool_attributes)
+        if attributes:
+            return {attribute.name: attribute.value for attribute in attributes}
+    return {}
+
+# the tool for a path: the command's settings, then the tool table entry the path names, then the path's own values
+# everything is checked here so a typo is reported with the path and tool it came from instead of failing later in a worker
+def resolve_tool (values, table, name):
+    settings = {}
+    if 'tool' in values:
+        if values['tool'] not in table:
+            raise ValueError (f'{name}: no tool named {values["tool"]} in the tool table')
+        settings.update (table[values['tool']])
+        name = f'{name} (tool {values["tool"]})'
+    settings.update ((key, value) for (key, value) in values.items() if key != 'tool')
+
+    taper_name_value = settings.get ('taper', taper_name)
+    if taper_name_value not in gouge_geometry.taper_profile_names:
+        raise ValueError (f'{name}: unknown taper profile {taper_name_value}, use one of {", ".join (gouge_geometry.taper_profile_names)}')
+
+    # samples only matter to the samples profile so they aren't even parsed for the others
+    try:
+        samples = settings.get ('samples', profile_samples) if taper_name_value == 'samples' else ()
+        samples = parse_samples (samples) if isinstance (samples, str) else tuple (float (value) for value in samples)
+        diameter = float (settings.get ('diameter', tool_diameter))
+        depth_scale = float (settings.get ('depth_scale', 1.0))
+    except (TypeError, ValueError):
+        raise ValueError (f'{name}: diameter, depth_scale and samples have to be numbers') from None
+    if diameter <= 0.0:
+        raise ValueError (f'{name}: tool diameter has to be more than zero')
+
+    taper = gouge_geometry.taper_profile (taper_name_value, station_count, samples)
+    return gouge_tool (diameter, depth_scale, taper)
+
+def load_tool_table (path):
+    if not path:
+        return {}
+    with open (path) as f:
+        return json.load (f)
+
+def nurbs_curve (rail):
+    control_points = [point3d (p) for p in rail.control_points]
+    return adsk.core.NurbsCurve3D.createNonRational (control_points, rail.degree, rail.knots, False)
+
+def point3d (p):
+    return adsk.core.Point3D.create (p[0], p[1], p[2])
+
+def vector3d (v):
+    return adsk.core.Vector3D.create (v[0], v[1], v[2])
+
+# make a planar disk for every section circle; the faces of the disks are used directly as loft sections
+# in a parametric design all the disks go into a single base feature so there's just one timeline entry
+# disks that are too far apart to touch are unioned into the same body so thousands of sections make only a few bodies
+# returns the section faces for each gouge and all the disk bodies
+def add_section_disks (component, circles):
+    temp_brep = adsk.fusion.TemporaryBRepManager.get()
+
+    parametric = component.parentDesign.designType == adsk.fusion.DesignTypes.ParametricDesignType
+    if parametric:
+        base_feature = component.features.baseFeatures.add()
+        base_feature.name = 'gouge sections'
+        base_feature.startEdit()
+
+    # each disk goes in the first body with room that has no disk within reach of it
+    reach = 2.0 * max ((radius for gouge_circles in circles for (center, axis, radius) in gouge_circles), default = 1.0)
+    groups = []
+    for (i, gouge_circles) in enumerate (circles):
+        for (k, (center, axis, radius)) in enumerate (gouge_circles):
+            circle = adsk.core.Circle3D.createByCenter (point3d (center), vector3d (axis), radius)
+            (wire, edge_map) = temp_brep.createWireFromCurves ([circle])
+            disk = temp_brep.createFaceFromPlanarWires ([wire])
+
+            placed = False
+            for group in groups:
+                (grid, group_body, members) = group
+                if len(members) >= section_body_size:
+                    continue
+                if any (gouge_geometry.distance (center, members[m][2]) <= radius + members[m][3] for m in grid.items_near (center)):
+                    continue
+                if temp_brep.booleanOperation (group_body, disk, adsk.fusion.BooleanTypes.UnionBooleanType):
+                    grid.add (center, center, len(members))
+                    members.append ((i, k, center, radius))
+                    placed = True
+                    break
+            if not placed:
+                grid = gouge_geometry.spatial_grid (reach)
+                grid.add (center, center, 0)
+                groups.append ((grid, disk, [(i, k, center, radius)]))
+
+    bodies = []
+    for (n, (grid, group_body, members)) in enumerate (groups):
+        if parametric:
+            body = component.bRepBodies.add (group_body, base_feature)
+        else:
+            body = component.bRepBodies.add (group_body)
+        body.name = f'sections {n}'
+        bodies.append (body)
+
+    # bodies have to be looked up again once the base feature is finished
+    if parametric:
+        base_feature.finishEdit()
+        named = {body.name: body for body in base_feature.bodies}
+        bodies = [named[f'sections {n}'] for n in range(len(groups))]
+
+    # a point on a disk is only within its radius of that disk's center since no other disk in the body can reach it
+    sections = [[None] * len(gouge_circles) for gouge_circles in circles]
+    for (body, (grid, group_body, members)) in zip (bodies, groups):
+        for face in body.faces:
+            p = face.pointOnFace
+            p = (p.x, p.y, p.z)
+            for m in grid.items_near (p):
+                (i, k, center, radius) = members[m]
+                if gouge_geometry.distance (p, center) <= radius:
+                    sections[i][k] = face
+                    break
+
+    return (sections, bodies)
+
+# cut the tool bodies from the target body with a single combine; the bodies in each group are joined together first
+# a join that fails is deleted and its bodies are cut as separate tools instead
+# returns the cut and the join for each group, which is None if the group didn't need one or it failed
+def combine_cut (component, target_body, groups):
+    combine_features = component.features.combineFeatures
+
+    tool_bodies = []
+    joins = []
+    for group in groups:
+        join = None
+        if len(group) > 1:
+            tools = adsk.core.ObjectCollection.create()
+            for body in group[1:]:
+                tools.add (body)
+            join_input = combine_features.createInput (group[0], tools)
+            join_input.operation = adsk.fusion.FeatureOperations.JoinFeatureOperation
+            join = add_feature (combine_features, join_input)
+            report_health (join, f'union of {group[0].name} and {len(group) - 1} more tool bodies')
+            run_profile.count ('features')
+            if failed (join):
+                delete_feature (join)
+                join = None
+        joins.append (join)
+        tool_bodies += [group[0]] if join else group
+
+    tools = adsk.core.ObjectCollection.create()
+    for body in tool_bodies:
+        tools.add (body)
+
+    cut_input = combine_features.createInput (target_body, tools)
+    cut_input.operation = adsk.fusion.FeatureOperations.CutFeatureOperation
+    cut_input.isKeepToolBodies = False
+
+    run_profile.count ('features')
+    return (add_feature (combine_features, cut_input), joins)
+
+def report_health (feature, name):
+    if feature is None:
+        debug_print (f'error: {name} could not be built')
+        return
+
+    health_state = feature.healthState
+
+    if health_state == adsk.fusion.FeatureHealthStates.HealthyFeatureHealthState:
+        debug_print (f'{name} successful')
+    elif health_state == adsk.fusion.FeatureHealthStates.WarningFeatureHealthState:
+        warning = feature.errorOrWarningMessage
+        debug_print (f'warning: {warning}')
+    elif health_state == adsk.fusion.FeatureHealthStates.ErrorFeatureHealthState:
+        error = feature.errorOrWarningMessage
+        debug_print (f'error: {error}')
+
+# print the profiler's summary table and write the json and csv reports
+def report_profile (run_profile, name):
+    for line in run_profile.summary():
+        palette_print (line)
+
+    report_path = os.path.join (report_folder, f'gouge profile {name} {time.strftime ("%Y%m%d-%H%M%S")}')
+    run_profile.write_json (report_path + '.json')
+    run_profile.write_csv (report_path + '.csv')
+    palette_print (f'profile written to {report_path}.json and .csv')
+
+def palette_print (msg):
+    palette_lines.append (msg)
+
+# write everything collected for the palette in a single write
+def flush_palette ():
+    if palette_lines:
+        text_palette = ui.palettes.itemById('TextCommands')
+        text_palette.writeText ('\n'.join (palette_lines))
+        palette_lines.clear()
 
 def debug_print (msg):
     if debug:
-        text_palette = ui.palettes.itemById('TextCommands')
-        text_palette.writeText (msg)
+        palette_print (msg)
 
 def debug_print_point (msg, point):
     if debug:
-        text_palette = ui.palettes.itemById('TextCommands')
-        text_palette.writeText (f'{msg}, ({point.x:.3f}, {point.y:.3f}, {point.z:.3f})')
+        palette_print (f'{msg}, ({point.x:.3f}, {point.y:.3f}, {point.z:.3f})')
         
 def stop(context):
     try:
         global handlers
         
         # Clean up the UI.
-        command_definitions = ui.commandDefinitions.itemById('gouge_surface')
-        if command_definitions:
-            command_definitions.deleteMe()
+        for id in ['gouge_surface', 'gouge_batch']:
+            command_definitions = ui.commandDefinitions.itemById(id)
+            if command_definitions:
+                command_definitions.deleteMe()
         
-        # get rid of this button
+        # get rid of these buttons
         moose_tools_panel = ui.allToolbarPanels.itemById('MoosePanel')
-        control = moose_tools_panel.controls.itemById('gouge_surface')
-        if control:
-            control.deleteMe()
+        for id in ['gouge_surface', 'gouge_batch']:
+            control = moose_tools_panel.controls.itemById(id)
+            if control:
+                control.deleteMe()
 
         # and if it's the last button, get rid of the moose panel
         if moose_tools_panel.controls.count == 0:
                     moose_tools_panel.deleteMe()
         
+        clear_preview()
+        app.unregisterCustomEvent (preview_event_id)
         handlers = []
 
     except:
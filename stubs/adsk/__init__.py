@@ -0,0 +1,29 @@
+# Author- Carl Bass
+# Description- stand-in for the fusion api so the add-in's geometry can run and be measured outside fusion
+#
+# only the handful of classes the gouge code touches are here; every call into them is counted in calls
+# put the stubs folder on sys.path ahead of anything else to use it
+
+import collections
+import functools
+
+calls = collections.Counter()
+
+# count every call to the wrapped function by its qualified name
+def record (function):
+    name = function.__qualname__
+
+    @functools.wraps (function)
+    def wrapper (*args, **kwargs):
+        calls[name] += 1
+        return function (*args, **kwargs)
+
+    return wrapper
+
+def reset ():
+    calls.clear()
+
+def total_calls ():
+    return sum (calls.values())
+
+from . import core, fusion, cam
@@ -0,0 +1,2 @@
+# Author- Carl Bass
+# Description- stand-in for adsk.cam; the add-in imports it but the geometry code never uses it
@@ -0,0 +1,162 @@
+# Author- Carl Bass
+# Description- stand-in for adsk.core with just enough geometry and ui to run the gouge code outside fusion
+
+import gouge_geometry
+
+from . import record
+
+class Point3D:
+    def __init__(self, x = 0.0, y = 0.0, z = 0.0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    @staticmethod
+    @record
+    def create (x = 0.0, y = 0.0, z = 0.0):
+        return Point3D (x, y, z)
+
+class Vector3D:
+    def __init__(self, x = 0.0, y = 0.0, z = 0.0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    @staticmethod
+    @record
+    def create (x = 0.0, y = 0.0, z = 0.0):
+        return Vector3D (x, y, z)
+
+# evaluator for a non-rational nurbs curve; the math is borrowed from the add-in's own geometry module
+class CurveEvaluator3D:
+    def __init__(self, curve):
+        self.curve = curve
+
+    @record
+    def getParameterExtents (self):
+        return (True, self.curve.knots[0], self.curve.knots[-1])
+
+    @record
+    def getEndPoints (self):
+        (status, start, end) = self.getParameterExtents()
+        return (True, self._point (start), self._point (end))
+
+    @record
+    def getPointAtParameter (self, parameter):
+        return (True, self._point (parameter))
+
+    @record
+    def getPointsAtParameters (self, parameters):
+        return (True, [self._point (u) for u in parameters])
+
+    @record
+    def getFirstDerivatives (self, parameters):
+        curve = self.curve
+        derivatives = [gouge_geometry.curve_derivative (curve.points, curve.knots, curve.degree, u) for u in parameters]
+        return (True, [Vector3D (*d) for d in derivatives])
+
+    def _point (self, u):
+        curve = self.curve
+        return Point3D (*gouge_geometry.curve_point (curve.points, curve.knots, curve.degree, u))
+
+class NurbsCurve3D:
+    objectType = 'adsk::core::NurbsCurve3D'
+
+    def __init__(self, points, degree, knots):
+        self.points = points
+        self.degree = degree
+        self.knots = knots
+        self.evaluator = CurveEvaluator3D (self)
+
+    @staticmethod
+    def classType ():
+        return NurbsCurve3D.objectType
+
+    @staticmethod
+    @record
+    def createNonRational (controlPoints, degree, knots, isPeriodic):
+        return NurbsCurve3D ([(p.x, p.y, p.z) for p in controlPoints], degree, list(knots))
+
+    @property
+    def controlPoints (self):
+        return [Point3D (*p) for p in self.points]
+
+    @property
+    def asNurbsCurve (self):
+        return self
+
+# evaluator for a surface given as a function returning the unit normal nearest a point
+class SurfaceEvaluator:
+    def __init__(self, normal_at):
+        self.normal_at = normal_at
+
+    @record
+    def getNormalAtPoint (self, point):
+        return (True, Vector3D (*self.normal_at ((point.x, point.y, point.z))))
+
+    @record
+    def getNormalsAtPoints (self, points):
+        return (True, [Vector3D (*self.normal_at ((p.x, p.y, p.z))) for p in points])
+
+class ObjectCollection (list):
+    @staticmethod
+    @record
+    def create ():
+        return ObjectCollection()
+
+class DropDownStyles:
+    TextListDropDownStyle = 0
+
+class TextCommandPalette:
+    def __init__(self):
+        self.text = []
+
+    @record
+    def writeText (self, text):
+        self.text.append (text)
+
+class Palettes:
+    def __init__(self):
+        self.text_commands = TextCommandPalette()
+
+    @record
+    def itemById (self, id):
+        return self.text_commands if id == 'TextCommands' else None
+
+class UserInterface:
+    def __init__(self):
+        self.palettes = Palettes()
+
+    @record
+    def messageBox (self, text):
+        print (text)
+
+class Application:
+    _application = None
+
+    def __init__(self):
+        self.userInterface = UserInterface()
+        self.activeProduct = None
+
+    @staticmethod
+    def get ():
+        if Application._application is None:
+            Application._application = Application()
+        return Application._application
+
+# event handler base classes the add-in derives from
+class EventHandler:
+    def __init__(self):
+        pass
+
+class CommandCreatedEventHandler (EventHandler):
+    pass
+
+class CommandEventHandler (EventHandler):
+    pass
+
+class InputChangedEventHandler (EventHandler):
+    pass
+
+class CustomEventHandler (EventHandler):
+    pass
@@ -0,0 +1,21 @@
+# Author- Carl Bass
+# Description- stand-in for adsk.fusion; only the enums the gouge code compares against
+
+class FeatureOperations:
+    JoinFeatureOperation = 0
+    CutFeatureOperation = 1
+    IntersectFeatureOperation = 2
+    NewBodyFeatureOperation = 3
+    NewComponentFeatureOperation = 4
+
+class FeatureHealthStates:
+    HealthyFeatureHealthState = 0
+    WarningFeatureHealthState = 1
+    ErrorFeatureHealthState = 2
+    SuppressedFeatureHealthState = 3
+    RolledBackFeatureHealthState = 4
+    UnknownFeatureHealthState = 5
+
+class DesignTypes:
+    DirectDesignType = 0
+    ParametricDesignType = 1
@@ -0,0 +1,26 @@
+# Author- Carl Bass
+# Description- lets the tests import the add-in modules and the adsk stand-in in ../stubs without fusion, and adds --slow
+
+import os
+import sys
+
+import pytest
+
+tests_folder = os.path.dirname (os.path.realpath (__file__))
+sys.path.insert (0, os.path.dirname (tests_folder))
+sys.path.insert (0, os.path.join (os.path.dirname (tests_folder), 'stubs'))
+
+# the slow cases only run when they're asked for
+def pytest_addoption (parser):
+    parser.addoption ('--slow', action = 'store_true', help = 'also run the tests marked slow')
+
+def pytest_configure (config):
+    config.addinivalue_line ('markers', 'slow: takes long enough that it only runs with --slow')
+
+def pytest_collection_modifyitems (config, items):
+    if config.getoption ('--slow'):
+        return
+    skip = pytest.mark.skip (reason = 'needs --slow')
+    for item in items:
+        if 'slow' in item.keywords:
+            item.add_marker (skip)
@@ -0,0 +1,27 @@
+# Author- Carl Bass
+# Description- checks that a job file that can't be run is reported instead of stopping the batch with a dialog
+
+import json
+
+import pytest
+
+import gouge_surface
+
+@pytest.mark.parametrize (('text', 'error'), [
+    ('{"jobs": [', 'json.decoder.JSONDecodeError'),
+    ('{"settings": {}}', "KeyError: 'jobs'"),
+    ('["sketch"]', 'ValueError: the jobs in a job file have to be a list of dicts'),
+])
+def test_a_bad_job_file_goes_in_the_report (tmp_path, monkeypatch, text, error):
+    monkeypatch.setattr (gouge_surface, 'report_folder', str (tmp_path))
+    path = tmp_path / 'jobs.json'
+    path.write_text (text)
+
+    assert gouge_surface.run_batch_file (str (path)) == []
+
+    (report_path,) = tmp_path.glob ('gouge batch *.json')
+    report = json.loads (report_path.read_text())
+    assert report['file'] == str (path)
+    assert report['jobs'] == []
+    assert report['error'].startswith (error)
+    gouge_surface.palette_lines.clear()
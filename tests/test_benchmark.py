@@ -0,0 +1,49 @@
+# Author- Carl Bass
+# Description- the benchmark cases under pytest-benchmark so ci can track them; skipped if the plugin isn't installed
+#
+#   pytest tests/test_benchmark.py --benchmark-autosave                 save a run
+#   pytest tests/test_benchmark.py --benchmark-compare-fail=mean:50%    fail if any case got more than 50% slower
+#   pytest tests/test_benchmark.py --slow                               include the 5000 curve cases
+
+import pytest
+
+pytest.importorskip ('pytest_benchmark')
+
+import benchmark as gouge_benchmark
+import gouge_surface
+
+def run (surface_name, count, mesh = False):
+    return gouge_benchmark.run_case (surface_name, count, gouge_surface.tool_diameter, gouge_surface.sampling_tolerance,
+                                     gouge_surface.section_tolerance, 1, mesh)
+
+# api calls per curve measured on these surfaces with about 10% to spare; more than this means batching got broken
+api_call_budget = {
+    'plane': 105,
+    'sphere': 50,
+    'cylinder': 50,
+}
+
+def check (result):
+    assert result['sections_per_curve'] >= 3
+    assert result['api_calls_per_curve'] <= api_call_budget[result['surface']]
+
+@pytest.mark.parametrize ('surface_name', sorted (gouge_benchmark.surfaces))
+@pytest.mark.parametrize ('count', [1, 100])
+def test_curves (benchmark, surface_name, count):
+    result = benchmark.pedantic (run, args = (surface_name, count), rounds = 3)
+    benchmark.extra_info.update (result)
+    check (result)
+
+# 5000 curves takes 20 to 30 sec a surface so it only runs with --slow
+@pytest.mark.slow
+@pytest.mark.parametrize ('surface_name', sorted (gouge_benchmark.surfaces))
+def test_5000_curves (benchmark, surface_name):
+    result = benchmark.pedantic (run, args = (surface_name, 5000), rounds = 1)
+    benchmark.extra_info.update (result)
+    check (result)
+
+@pytest.mark.parametrize ('surface_name', sorted (gouge_benchmark.surfaces))
+def test_mesh (benchmark, surface_name):
+    result = benchmark.pedantic (run, args = (surface_name, 10, True), rounds = 1)
+    benchmark.extra_info.update (result)
+    assert result['mesh_vertices'] > 0
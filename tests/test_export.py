@@ -0,0 +1,67 @@
+# Author- Carl Bass
+# Description- checks of the toolpath files gouge_export writes
+
+import csv
+import json
+import math
+
+import pytest
+
+import gouge_export
+
+toolpaths = [
+    [((0.0, 0.0, 0.0), (0.0, 0.0, 1.0)), ((1.0, 0.0, 0.0), (0.0, 0.0, 1.0)), ((2.0, 0.0, 0.0), (0.0, 0.0, 1.0)), ((2.0, 1.0, -0.1), (0.0, 0.0, 1.0))],
+    [((5.0, 5.0, 0.2), (0.0, 0.0, 1.0)), ((6.0, 5.0, 0.2), (0.0, 0.0, 1.0))],
+]
+
+def test_write_gcode_merges_straight_runs_and_works_in_millimeters (tmp_path):
+    path = tmp_path / 'gouges.nc'
+    (moves, points) = gouge_export.write_gcode (str (path), toolpaths, [0.3, 0.3], 1000.0, 300.0, 0.5, 1.0e-4, 'test (1)')
+    assert (moves, points) == (5, 6)
+
+    lines = path.read_text().splitlines()
+    assert lines[0] == '%' and lines[-1] == '%'
+    assert lines[1] == '(test [1])'
+    assert 'G21 G90 G17' in lines
+    assert 'G0 Z7.0000' in lines
+    assert 'G1 X20.0000 Y0.0000 Z0.0000' in lines
+    assert 'G1 X10.0000 Y0.0000 Z0.0000' not in lines
+    assert 'G1 X20.0000 Y10.0000 Z-1.0000' in lines
+    assert sum (1 for line in lines if line.startswith ('(toolpath')) == 2
+    assert '(toolpath 0 6.000 mm ball end mill)' in lines
+
+def test_write_gcode_moves_the_tip_so_the_ball_touches_a_tilted_surface (tmp_path):
+    # a plane tilted 45 degrees about x with the gouge bottom along x on it
+    s = math.sqrt (0.5)
+    normal = (0.0, -s, s)
+    radius = 0.5
+    tilted = [[((float (x), 0.0, 0.0), normal) for x in range(3)]]
+    path = tmp_path / 'tilted.nc'
+    gouge_export.write_gcode (str (path), tilted, [radius], 1000.0, 300.0, 0.5, 1.0e-4)
+
+    moves = [line.split() for line in path.read_text().splitlines() if line.startswith ('G1 X')]
+    assert moves
+    for move in moves:
+        tip = [float (word[1:]) / 10.0 for word in move[1:4]]
+
+        # the ball sits on the tip so its center is a radius up, and that has to be a radius off the plane right over the gouge
+        center = (tip[0], tip[1], tip[2] + radius)
+        assert sum (c * n for (c, n) in zip (center, normal)) == pytest.approx (radius, abs = 1.0e-4)
+        assert (center[1], center[2]) == pytest.approx ((-radius * s, radius * s), abs = 1.0e-4)
+        assert tip[2] < 0.0
+
+def test_write_csv_and_json_keep_every_point (tmp_path):
+    csv_path = tmp_path / 'gouges.csv'
+    json_path = tmp_path / 'gouges.json'
+    gouge_export.write_csv (str (csv_path), toolpaths)
+    gouge_export.write_json (str (json_path), toolpaths)
+
+    with open (csv_path, newline = '') as f:
+        rows = list (csv.reader (f))
+    assert rows[0] == ['toolpath', 'x', 'y', 'z', 'i', 'j', 'k']
+    assert len(rows) == 7
+    assert rows[-1][0] == '1'
+
+    report = json.loads (json_path.read_text())
+    assert report['units'] == 'cm'
+    assert [len(toolpath['points']) for toolpath in report['toolpaths']] == [4, 2]
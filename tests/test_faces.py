@@ -0,0 +1,50 @@
+# Author- Carl Bass
+# Description- checks of how gouge_surface's face set decides which face a sample is on, using stand-in faces
+
+import adsk.core
+import gouge_surface
+
+class box:
+    def __init__(self, low, high):
+        self.minPoint = adsk.core.Point3D (*low)
+        self.maxPoint = adsk.core.Point3D (*high)
+
+# a face on the plane z = height whose evaluator can be made to fail the point lookups
+class evaluator:
+    def __init__(self, height, works):
+        self.height = height
+        self.works = works
+
+    def getParametersAtPoints (self, points):
+        if not self.works:
+            return (False, [])
+        return (True, [(p.x, p.y) for p in points])
+
+    def getPointsAtParameters (self, parameters):
+        return (True, [adsk.core.Point3D (u, v, self.height) for (u, v) in parameters])
+
+    def getNormalsAtPoints (self, points):
+        return (True, [adsk.core.Vector3D (0.0, 0.0, 1.0) for p in points])
+
+class face:
+    def __init__(self, body, low, high, works = True):
+        self.body = body
+        self.boundingBox = box (low, high)
+        self.evaluator = evaluator (low[2], works)
+
+def test_overlapping_faces_go_to_the_closest_surface ():
+    body = object()
+    faces = gouge_surface.face_set ([face (body, (0.0, 0.0, 0.0), (2.0, 2.0, 0.0)), face (body, (1.0, 0.0, 0.1), (3.0, 2.0, 0.1))])
+    points = [adsk.core.Point3D (0.5, 1.0, 0.0), adsk.core.Point3D (1.5, 1.0, 0.09), adsk.core.Point3D (2.5, 1.0, 0.1)]
+    assert faces.assign_faces (points) == [0, 1, 1]
+
+def test_points_a_face_cant_evaluate_still_get_a_face ():
+    body = object()
+    faces = gouge_surface.face_set ([face (body, (0.0, 0.0, 0.0), (2.0, 2.0, 0.0), works = False), face (body, (1.0, 0.0, 0.0), (3.0, 2.0, 0.0), works = False)])
+    points = [adsk.core.Point3D (1.5, 1.0, 0.0), adsk.core.Point3D (0.5, 1.0, 0.0)]
+    assignment = faces.assign_faces (points)
+    assert None not in assignment
+    assert assignment[1] == 0
+
+    (status, normals) = faces.getNormalsAtPoints (points)
+    assert status and len(normals) == 2
@@ -0,0 +1,165 @@
+# Author- Carl Bass
+# Description- checks of the plain python geometry in gouge_geometry
+
+import math
+
+import pytest
+
+import gouge_geometry
+
+def close (a, b, tolerance = 1.0e-9):
+    return gouge_geometry.distance (a, b) <= tolerance
+
+def line_rail (start, end, count = 9, normal = (0.0, 0.0, 1.0)):
+    points = [gouge_geometry.add (start, gouge_geometry.scale (gouge_geometry.sub (end, start), j / (count - 1))) for j in range(count)]
+    (control_points, knots, degree) = gouge_geometry.fit_nurbs (points)
+    return gouge_geometry.rail_curve (control_points, knots, degree, gouge_geometry.length_fractions (points), [normal] * count)
+
+# fit_nurbs
+
+def test_fit_nurbs_interpolates_the_points ():
+    points = [(j, math.sin (j), 0.1 * j * j) for j in range(8)]
+    (control_points, knots, degree) = gouge_geometry.fit_nurbs (points)
+    assert degree == 3
+    assert len(knots) == len(control_points) + degree + 1
+    for (p, t) in zip (points, gouge_geometry.length_fractions (points)):
+        assert close (gouge_geometry.curve_point (control_points, knots, degree, t), p, 1.0e-6)
+
+def test_fit_nurbs_lowers_the_degree_for_few_points ():
+    (control_points, knots, degree) = gouge_geometry.fit_nurbs ([(0.0, 0.0, 0.0), (1.0, 2.0, 3.0)])
+    assert degree == 1
+    assert knots == [0.0, 0.0, 1.0, 1.0]
+
+def test_fit_nurbs_rejects_a_single_point ():
+    with pytest.raises (ValueError):
+        gouge_geometry.fit_nurbs ([(1.0, 1.0, 1.0)] * 5)
+    assert not gouge_geometry.has_length ([(1.0, 1.0, 1.0)] * 5)
+    assert not gouge_geometry.has_length ([])
+
+# taper_fraction
+
+@pytest.mark.parametrize ('name', ['sine', 'linear', 'cosine', 'elliptic'])
+def test_named_tapers_are_zero_at_the_ends_and_full_in_the_middle (name):
+    profile = gouge_geometry.taper_profile (name, 3, ())
+    assert gouge_geometry.taper_fraction (profile, 0.0) == pytest.approx (0.0, abs = 1.0e-12)
+    assert gouge_geometry.taper_fraction (profile, 1.0) == pytest.approx (0.0, abs = 1.0e-12)
+    assert gouge_geometry.taper_fraction (profile, 0.5) == pytest.approx (1.0)
+
+def test_sample_taper_interpolates_between_samples ():
+    profile = gouge_geometry.taper_profile ('samples', 3, (0.0, 1.0, 0.5))
+    assert gouge_geometry.taper_fraction (profile, 0.25) == pytest.approx (0.5)
+    assert gouge_geometry.taper_fraction (profile, 0.75) == pytest.approx (0.75)
+    assert gouge_geometry.taper_fraction (profile, 2.0) == pytest.approx (0.5)
+
+def test_unknown_taper_is_an_error ():
+    with pytest.raises (ValueError):
+        gouge_geometry.taper_fraction (gouge_geometry.taper_profile ('wavy', 3, ()), 0.5)
+
+# chain_curves
+
+def test_chain_curves_joins_and_flips_connected_curves ():
+    endpoints = [((1.0, 0.0, 0.0), (2.0, 0.0, 0.0)), ((0.0, 0.0, 0.0), (1.0, 0.0, 0.0)), ((3.0, 0.0, 0.0), (2.0, 0.0, 0.0)), ((0.0, 5.0, 0.0), (1.0, 5.0, 0.0))]
+    chains = gouge_geometry.chain_curves (endpoints, 1.0e-6)
+    assert chains == [[(1, False), (0, False), (2, True)], [(3, False)]]
+
+def test_chain_curves_stops_where_more_than_two_curves_meet ():
+    endpoints = [((0.0, 0.0, 0.0), (1.0, 0.0, 0.0)), ((1.0, 0.0, 0.0), (2.0, 0.0, 0.0)), ((1.0, 0.0, 0.0), (1.0, 1.0, 0.0))]
+    chains = gouge_geometry.chain_curves (endpoints, 1.0e-6)
+    assert sorted (len(chain) for chain in chains) == [1, 1, 1]
+
+# rail_clusters
+
+def test_rail_clusters_groups_rails_within_reach ():
+    rails = [line_rail ((0.0, 0.0, 0.0), (10.0, 0.0, 0.0)),
+             line_rail ((0.0, 0.5, 0.0), (10.0, 0.5, 0.0)),
+             line_rail ((0.0, 5.0, 0.0), (10.0, 5.0, 0.0)),
+             line_rail ((5.0, -1.0, 0.0), (5.0, -0.2, 0.0))]
+    assert gouge_geometry.rail_clusters (rails, 1.0) == [[0, 1, 3], [2]]
+    assert gouge_geometry.rail_clusters (rails, 0.1) == [[0], [1], [2], [3]]
+
+# merge_collinear
+
+def test_merge_collinear_keeps_only_the_corners ():
+    points = [(j * 0.1, 0.0, 0.0) for j in range(11)] + [(1.0, j * 0.1, 0.0) for j in range(1, 11)]
+    assert gouge_geometry.merge_collinear (points, 1.0e-6) == [0, 10, 20]
+
+def test_merge_collinear_stays_within_tolerance ():
+    points = [(j * 0.1, math.sin (j * 0.1), 0.0) for j in range(60)]
+    kept = gouge_geometry.merge_collinear (points, 0.01)
+    assert kept[0] == 0 and kept[-1] == len(points) - 1
+    assert len(kept) < len(points)
+    for (a, b) in zip (kept, kept[1:]):
+        for k in range(a + 1, b):
+            assert gouge_geometry.point_segment_distance (points[k], points[a], points[b]) <= 0.01
+
+# gouge_job and toolpaths
+
+def test_gouge_job_rail_follows_the_taper ():
+    points = [(j * 0.5, 0.0, 0.0) for j in range(21)]
+    normals = [(0.0, 0.0, 1.0)] * len(points)
+    (rail, circles) = gouge_geometry.gouge_job ((points, normals, 0.2, tuple (gouge_geometry.default_taper_profile), math.radians (10.0), 0.25))
+    middle = gouge_geometry.curve_point (rail.control_points, rail.knots, rail.degree, 0.5)
+    assert middle[2] == pytest.approx (-0.2, abs = 1.0e-3)
+    assert len(circles) >= 3
+    for (center, axis, radius) in circles:
+        assert radius == 0.25
+        assert abs (axis[1]) < 1.0e-9
+
+def test_toolpath_points_stay_within_tolerance ():
+    rail = line_rail ((0.0, 0.0, 0.0), (4.0, 0.0, 0.0))
+    toolpath = gouge_geometry.toolpath_points (rail, 1.0e-3)
+    assert close (toolpath[0][0], (0.0, 0.0, 0.0), 1.0e-6)
+    assert close (toolpath[-1][0], (4.0, 0.0, 0.0), 1.0e-6)
+    assert all (close (axis, (0.0, 0.0, 1.0)) for (point, axis) in toolpath)
+
+def test_tool_tip_rail_sits_the_ball_on_a_tilted_rail ():
+    s = math.sqrt (0.5)
+    rail = line_rail ((0.0, 0.0, 0.0), (4.0, 0.0, 0.0), normal = (0.0, -s, s))
+    tip_rail = gouge_geometry.tool_tip_rail (rail, 0.5)
+    for t in (0.0, 0.3, 1.0):
+        tip = gouge_geometry.curve_point (tip_rail.control_points, tip_rail.knots, tip_rail.degree, t)
+        assert close (tip, (4.0 * t, -0.5 * s, 0.5 * s - 0.5), 1.0e-6)
+
+# gouge_mesh
+
+def square_mesh (size, count):
+    points = [(size * i / count, size * j / count, 0.0) for j in range(count + 1) for i in range(count + 1)]
+    triangles = []
+    for j in range(count):
+        for i in range(count):
+            a = j * (count + 1) + i
+            triangles += [(a, a + 1, a + count + 2), (a, a + count + 2, a + count + 1)]
+    return (points, [(0.0, 0.0, 1.0)] * len(points), triangles)
+
+def test_gouge_mesh_presses_a_groove_along_the_rail ():
+    (points, normals, triangles) = square_mesh (10.0, 8)
+    radius = 0.5
+    rail = line_rail ((1.0, 5.0, -0.2), (9.0, 5.0, -0.2))
+    (gouged, gouged_normals, gouged_triangles, moved, capped) = gouge_geometry.gouge_mesh (points, normals, triangles, [rail], [radius], 0.25, 100000)
+
+    assert moved > 0
+    assert not capped
+    assert len(gouged) > len(points)
+    assert len(gouged_normals) == len(gouged)
+
+    # nothing goes below the bottom of the tool and nothing away from the rail moves
+    assert min (p[2] for p in gouged) == pytest.approx (-0.2, abs = 1.0e-6)
+    for p in gouged:
+        if abs (p[1] - 5.0) > radius or p[0] < 1.0 - radius or p[0] > 9.0 + radius:
+            assert p[2] == 0.0
+
+def test_gouge_mesh_respects_the_vertex_cap ():
+    (points, normals, triangles) = square_mesh (10.0, 4)
+    rail = line_rail ((1.0, 5.0, -0.2), (9.0, 5.0, -0.2))
+    (gouged, gouged_normals, gouged_triangles, moved, capped) = gouge_geometry.gouge_mesh (points, normals, triangles, [rail], [0.5], 0.01, 200)
+    assert len(gouged) == 200
+    assert capped
+
+    # the budget is spread along the whole rail instead of used up at one end
+    added = gouged[len(points):]
+    assert min (p[0] for p in added) < 3.0
+    assert max (p[0] for p in added) > 7.0
+
+def test_polygon_triangles_fans_quads_and_polygons ():
+    triangles = gouge_geometry.polygon_triangles ([0, 1, 2, 3], [4, 5, 6, 7, 8, 9, 10, 11], [5, 3])
+    assert triangles == [(0, 1, 2), (0, 2, 3), (4, 5, 6), (4, 6, 7), (4, 7, 8), (9, 10, 11)]
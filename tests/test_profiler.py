@@ -0,0 +1,54 @@
+# Author- Carl Bass
+# Description- checks of the phase timing and counters in gouge_profiler and what a run charges to each curve
+
+import json
+import math
+
+import pytest
+
+import gouge_geometry
+import gouge_profiler
+import gouge_surface
+
+def test_phases_are_timed_per_curve_and_counted (tmp_path):
+    profile = gouge_profiler.profiler()
+    for curve in range(3):
+        with profile.phase ('sampling', curve):
+            pass
+    with profile.phase ('cutting'):
+        pass
+    profile.count ('api calls', 10)
+    profile.count ('api calls', 5)
+
+    assert list (profile.totals) == ['sampling', 'cutting']
+    assert profile.counts['sampling'] == 3
+    assert profile.counters['api calls'] == 15
+    assert sorted (profile.curves) == [0, 1, 2]
+
+    lines = profile.summary()
+    assert lines[0].split() == ['phase', 'calls', 'sec', '%']
+    assert any (line.split()[:2] == ['api', 'calls'] for line in lines)
+
+    path = tmp_path / 'profile.json'
+    profile.write_json (str (path))
+    report = json.loads (path.read_text())
+    assert report['phases']['sampling']['calls'] == 3
+    assert report['counters'] == {'api calls': 15}
+    assert set (report['curves']) == {'0', '1', '2'}
+
+def test_a_phase_is_timed_even_when_it_raises ():
+    profile = gouge_profiler.profiler()
+    with pytest.raises (RuntimeError):
+        with profile.phase ('lofts'):
+            raise RuntimeError ('loft failed')
+    assert profile.counts['lofts'] == 1
+
+def test_gouges_computed_in_process_are_timed_per_curve ():
+    points = [(j * 0.5, 0.0, 0.0) for j in range(9)]
+    job = (points, [(0.0, 0.0, 1.0)] * len(points), 0.1, tuple (gouge_geometry.default_taper_profile), math.radians (30.0), 0.125)
+    gouge_surface.run_profile = gouge_profiler.profiler()
+    results = gouge_surface.compute_gouges ([job, job], 1, [4, 7])
+
+    assert len(results) == 2
+    assert sorted (gouge_surface.run_profile.curves) == [4, 7]
+    assert set (gouge_surface.run_profile.curves[4]) == {'rail', 'sections'}
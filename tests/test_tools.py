@@ -0,0 +1,40 @@
+# Author- Carl Bass
+# Description- checks of how gouge_surface resolves each path's tool from curve attributes and the tool table
+
+import pytest
+
+import gouge_surface
+
+table = {
+    'fine': {'diameter': 0.1, 'taper': 'linear'},
+    'typo': {'taper': 'lineer'},
+}
+
+def test_curve_values_override_the_tool_table_and_defaults ():
+    tool = gouge_surface.resolve_tool ({'tool': 'fine', 'depth_scale': '0.5'}, table, 'toolpath 0')
+    assert tool.diameter == 0.1
+    assert tool.depth_scale == 0.5
+    assert tool.taper.name == 'linear'
+
+    tool = gouge_surface.resolve_tool ({}, table, 'toolpath 1')
+    assert tool.diameter == gouge_surface.tool_diameter
+    assert tool.taper.name == gouge_surface.taper_name
+
+def test_samples_can_be_text_or_numbers ():
+    assert gouge_surface.resolve_tool ({'taper': 'samples', 'samples': '0, 1 0'}, {}, 'toolpath 0').taper.samples == (0.0, 1.0, 0.0)
+    assert gouge_surface.resolve_tool ({'tool': 't', 'taper': 'samples'}, {'t': {'samples': [0, 0.5]}}, 'toolpath 0').taper.samples == (0.0, 0.5)
+
+def test_samples_are_only_read_by_the_samples_profile ():
+    tool = gouge_surface.resolve_tool ({'taper': 'linear', 'samples': '0, one, 0'}, {}, 'toolpath 0')
+    assert tool.taper.samples == ()
+
+@pytest.mark.parametrize (('values', 'message'), [
+    ({'tool': 'missing'}, 'toolpath 3: no tool named missing'),
+    ({'tool': 'typo'}, 'toolpath 3 (tool typo): unknown taper profile lineer'),
+    ({'taper': 'wavy'}, 'toolpath 3: unknown taper profile wavy'),
+    ({'taper': 'samples', 'samples': '0, one, 0'}, 'toolpath 3: diameter, depth_scale and samples have to be numbers'),
+    ({'diameter': '0'}, 'toolpath 3: tool diameter has to be more than zero'),
+])
+def test_bad_values_name_the_path_and_tool (values, message):
+    with pytest.raises (ValueError, match = message.replace ('(', r'\(').replace (')', r'\)')):
+        gouge_surface.resolve_tool (values, table, 'toolpath 3')